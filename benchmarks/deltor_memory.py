@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Northwestern University.
+#
+# galter-subjects-utils is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file for more
+# details.
+
+"""Benchmark peak memory of DeltasGenerator analysis.
+
+Usage:
+
+    python benchmarks/deltor_memory.py [SIZE] [--external]
+
+SIZE is the number of src subjects (default 1M). src and dst are streamed
+(as they are from the DB and from files), so the peak is what the analysis
+itself keeps: 5% of subjects are relabelled, 5% removed (half of those
+replaced) and 5% added.
+
+With --external, ExternalDeltasGenerator is measured instead (analysis
+and generation are interleaved, so only the total peak is reported).
+"""
+
+import sys
+import time
+import tracemalloc
+
+from galter_subjects_utils.deltor import DeltasGenerator, \
+    ExternalDeltasGenerator
+from galter_subjects_utils.scheme import Scheme
+from galter_subjects_utils.types_internal import Subject
+
+
+def src_subjects(size):
+    """Stream src subjects."""
+    for i in range(size):
+        yield Subject(id=f"sh{i:08d}", label=f"Heading number {i}")
+
+
+def dst_subjects(size):
+    """Stream dst subjects."""
+    for i in range(size):
+        if i % 20 == 0:
+            continue  # removed
+        label = f"Heading renumbered {i}" if i % 20 == 1 else f"Heading number {i}"  # noqa
+        yield Subject(id=f"sh{i:08d}", label=label)
+        if i % 20 == 2:
+            yield Subject(id=f"new{i:08d}", label=f"New heading {i}")
+
+
+def replacements(size):
+    """Return replacements of half the removed subjects."""
+    return {
+        f"Heading number {i}": f"New heading {i + 2}"
+        for i in range(0, size, 40)
+    }
+
+
+def main_external(size):
+    """Print peak memory of external generation."""
+    deltor = ExternalDeltasGenerator(
+        src_subjects(size),
+        dst_subjects(size),
+        Scheme("S", "s:"),
+        replacements(size),
+    )
+    tracemalloc.start()
+    start = time.perf_counter()
+    count = sum(1 for _ in deltor.iter_generate())
+    _, peak = tracemalloc.get_traced_memory()
+    elapsed = time.perf_counter() - start
+    tracemalloc.stop()
+
+    print(f"src subjects:        {size:,}")
+    print(f"ops:                 {count:,}")
+    print(f"peak total (MB):     {peak / 2**20:,.1f}")
+    print(f"elapsed (s):         {elapsed:,.1f}")
+
+
+def main(size):
+    """Print peak memory of analysis and of whole generation."""
+    deltor = DeltasGenerator(
+        src_subjects(size),
+        dst_subjects(size),
+        Scheme("S", "s:"),
+        replacements(size),
+    )
+    tracemalloc.start()
+    start = time.perf_counter()
+    deltor._analyze_src()
+    deltor._analyze_dst()
+    deltor._analyze_replace()
+    _, peak_analysis = tracemalloc.get_traced_memory()
+    ops = list(deltor._generate_ops())
+    _, peak = tracemalloc.get_traced_memory()
+    elapsed = time.perf_counter() - start
+    tracemalloc.stop()
+
+    print(f"src subjects:        {size:,}")
+    print(f"ops:                 {len(ops):,}")
+    print(f"peak analysis (MB):  {peak_analysis / 2**20:,.1f}")
+    print(f"peak total (MB):     {peak / 2**20:,.1f}")
+    print(f"elapsed (s):         {elapsed:,.1f}")
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if a != "--external"]
+    size = int(args[0]) if args else 1_000_000
+    if "--external" in sys.argv:
+        main_external(size)
+    else:
+        main(size)
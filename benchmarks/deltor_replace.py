@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Northwestern University.
+#
+# galter-subjects-utils is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file for more
+# details.
+
+"""Benchmark scaling of DeltasGenerator replacement analysis.
+
+Usage:
+
+    python benchmarks/deltor_replace.py [SIZE ...]
+
+Each size is the number of src subjects. 10% of them are removed from dst
+and have a replacement: a third by a newly added subject, a third by a
+relabelled subject and a third by an unknown label (worst case lookup).
+Replacement analysis should grow linearly with size.
+"""
+
+import sys
+import time
+
+from galter_subjects_utils.deltor import DeltasGenerator
+from galter_subjects_utils.scheme import Scheme
+from galter_subjects_utils.types_internal import Subject
+
+
+def synthetic(size):
+    """Return src, dst, replacements of `size` src subjects."""
+    src = [Subject(id=f"s{i}", label=f"Label {i}") for i in range(size)]
+    dst = []
+    replacements = {}
+    for i, subject in enumerate(src):
+        if i % 10 != 0:
+            # kept (every 7th relabelled)
+            label = f"Relabel {i}" if i % 7 == 0 else subject.label
+            dst.append(Subject(id=subject.id, label=label))
+            continue
+        # removed and replaced
+        if i % 3 == 0:
+            dst.append(Subject(id=f"a{i}", label=f"Added {i}"))
+            replacements[subject.label] = f"Added {i}"
+        elif i % 3 == 1:
+            replacements[subject.label] = f"Relabel {i + 7 - i % 7}"
+        else:
+            replacements[subject.label] = f"Unknown {i}"
+    return src, dst, replacements
+
+
+def run(size):
+    """Return seconds spent in each phase for `size`."""
+    src, dst, replacements = synthetic(size)
+    deltor = DeltasGenerator(src, dst, Scheme("S", "s:"), replacements)
+    timings = {}
+    for phase in ["_analyze_src", "_analyze_dst", "_analyze_replace"]:
+        start = time.perf_counter()
+        getattr(deltor, phase)()
+        timings[phase] = time.perf_counter() - start
+    return timings
+
+
+def main(sizes):
+    """Print timings per size."""
+    print(f"{'size':>10} {'src':>10} {'dst':>10} {'replace':>10}")
+    for size in sizes:
+        t = run(size)
+        print(
+            f"{size:>10} {t['_analyze_src']:>10.3f} "
+            f"{t['_analyze_dst']:>10.3f} {t['_analyze_replace']:>10.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [10000, 20000, 40000, 80000])
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Northwestern University.
+#
+# galter-subjects-utils is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file for more
+# details.
+
+"""Offline benchmark suite of delta generation.
+
+Usage:
+
+    python benchmarks/deltor_suite.py [--size N] [--adds R] [--renames R]
+        [--replacements R] [--removals R] [--mode MODE] [--seed S]
+        [--output FILE]
+
+Synthetic src/dst subjects are generated (no database nor search engine
+needed) with the given churn ratios (fractions of src size). Replaced
+subjects are replaced by newly added subjects (on top of --adds). Each
+phase is timed, then the run is repeated under tracemalloc for the peak
+memory. Results are printed (or written to FILE) as JSON, so that runs
+can be compared across commits.
+"""
+
+import argparse
+import json
+import platform
+import random
+import subprocess
+import time
+import tracemalloc
+from collections import Counter
+
+from galter_subjects_utils.deltor import DeltasGenerator, \
+    ExternalDeltasGenerator
+from galter_subjects_utils.metrics import UpdateMetrics
+from galter_subjects_utils.scheme import Scheme
+from galter_subjects_utils.types_internal import Subject
+
+generators = {
+    "memory": DeltasGenerator,
+    "external": ExternalDeltasGenerator,
+}
+
+REMOVED, REPLACED, RENAMED, KEPT = range(4)
+
+
+def fates(params):
+    """Yield fate of each src subject (same sequence for same params)."""
+    rng = random.Random(params["seed"])
+    removals = params["removals"]
+    replacements = removals + params["replacements"]
+    renames = replacements + params["renames"]
+    for _ in range(params["size"]):
+        r = rng.random()
+        if r < removals:
+            yield REMOVED
+        elif r < replacements:
+            yield REPLACED
+        elif r < renames:
+            yield RENAMED
+        else:
+            yield KEPT
+
+
+def src_subjects(params):
+    """Stream src subjects."""
+    for i in range(params["size"]):
+        yield Subject(id=f"sh{i:08d}", label=f"Heading number {i}")
+
+
+def dst_subjects(params):
+    """Stream dst subjects."""
+    for i, fate in enumerate(fates(params)):
+        if fate == RENAMED:
+            yield Subject(id=f"sh{i:08d}", label=f"Heading renamed {i}")
+        elif fate == KEPT:
+            yield Subject(id=f"sh{i:08d}", label=f"Heading number {i}")
+        elif fate == REPLACED:
+            yield Subject(id=f"rp{i:08d}", label=f"Replacing heading {i}")
+    for i in range(int(params["size"] * params["adds"])):
+        yield Subject(id=f"nw{i:08d}", label=f"New heading {i}")
+
+
+def replacements_of(params):
+    """Return replacements (src label -> dst label)."""
+    return {
+        f"Heading number {i}": f"Replacing heading {i}"
+        for i, fate in enumerate(fates(params))
+        if fate == REPLACED
+    }
+
+
+def run(params, metrics):
+    """Generate deltas timing phases in `metrics`. Return ops per type."""
+    deltor = generators[params["mode"]](
+        src_subjects(params),
+        dst_subjects(params),
+        Scheme("S", "s:"),
+        replacements_of(params),
+    )
+    if params["mode"] == "external":
+        # Phases are interleaved
+        with metrics.phase("generate"):
+            return Counter(op["type"] for op in deltor.iter_generate())
+
+    with metrics.phase("analyze_src"):
+        deltor._analyze_src()
+    with metrics.phase("analyze_dst"):
+        deltor._analyze_dst()
+    with metrics.phase("analyze_replace"):
+        deltor._analyze_replace()
+    with metrics.phase("generate_ops"):
+        return Counter(op["type"] for op in deltor._generate_ops())
+
+
+def current_commit():
+    """Return current git commit (if any)."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(params):
+    """Return benchmark results."""
+    metrics = UpdateMetrics()
+    ops = run(params, metrics)
+    elapsed = metrics.elapsed
+
+    tracemalloc.start()
+    run(params, UpdateMetrics())
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    total = sum(ops.values())
+    return {
+        "benchmark": "deltor",
+        "commit": current_commit(),
+        "python": platform.python_version(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "params": params,
+        "results": {
+            "elapsed": elapsed,
+            "phases": metrics.phases,
+            "ops": total,
+            "ops_by_type": dict(ops),
+            "ops_per_sec": total / elapsed if elapsed else 0.0,
+            "subjects_per_sec": params["size"] / elapsed if elapsed else 0.0,
+            "peak_memory_mb": peak / 2**20,
+        },
+    }
+
+
+def parse_args():
+    """Return params out of command line."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--adds", type=float, default=0.02)
+    parser.add_argument("--renames", type=float, default=0.02)
+    parser.add_argument("--replacements", type=float, default=0.01)
+    parser.add_argument("--removals", type=float, default=0.01)
+    parser.add_argument("--mode", choices=generators, default="memory")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="JSON file (default: stdout)")
+    return vars(parser.parse_args())
+
+
+if __name__ == "__main__":
+    params = parse_args()
+    output = params.pop("output")
+    results = main(params)
+    if output:
+        with open(output, "w") as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Northwestern University.
+#
+# galter-subjects-utils is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file for more
+# details.
+
+"""Benchmark jsonl reading of an LCSH-shaped dump.
+
+Usage:
+
+    python benchmarks/read_jsonl.py [LINES ...]
+
+A synthetic file shaped like the LCSH skosrdf dump (one JSON-LD graph of
+a concept and its change sets per line) is written for each number of
+lines, then read with stdlib json in text mode (the former way) and with
+`read_jsonl` (orjson if installed, binary mode, large buffer).
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+from galter_subjects_utils.reader import json_loads, read_jsonl
+
+
+def lcsh_like(i):
+    """Return LCSH-shaped graph of concept `i`."""
+    concept = f"http://id.loc.gov/authorities/subjects/sh{i:08d}"
+    changes = [f"_:n{i:08d}b{n}" for n in range(3)]
+    return {
+        "@context": "http://v3/authorities/subjects/context.json",
+        "@graph": [
+            {
+                "@id": change,
+                "@type": "cs:ChangeSet",
+                "cs:changeReason": "revised",
+                "cs:createdDate": {
+                    "@type": "xsd:dateTime",
+                    "@value": "2007-10-12T07:53:10",
+                },
+                "cs:creatorName": {
+                    "@id": "http://id.loc.gov/vocabulary/organizations/dlc"
+                },
+                "cs:subjectOfChange": {"@id": concept},
+            }
+            for change in changes
+        ] + [
+            {
+                "@id": concept,
+                "@type": "skos:Concept",
+                "skos:broader": [
+                    {"@id": f"http://id.loc.gov/authorities/subjects/sh{b}"}
+                    for b in range(i % 4)
+                ],
+                "skos:changeNote": [{"@id": change} for change in changes],
+                "skos:inScheme": {
+                    "@id": "http://id.loc.gov/authorities/subjects"
+                },
+                "skos:prefLabel": {
+                    "@language": "en",
+                    "@value": f"Heading number {i} (Ünïcode)",
+                },
+            },
+        ],
+        "@id": f"/authorities/subjects/sh{i:08d}",
+    }
+
+
+def write_synthetic(lines, filepath):
+    """Write `lines` LCSH-shaped lines to `filepath`."""
+    with open(filepath, "w") as f:
+        for i in range(lines):
+            f.write(json.dumps(lcsh_like(i)) + "\n")
+
+
+def read_jsonl_stdlib(filepath):
+    """Read jsonl file as `read_jsonl` used to."""
+    with open(filepath) as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def timed(reader, filepath):
+    """Return seconds to read all of `filepath` with `reader`."""
+    start = time.perf_counter()
+    for _ in reader(filepath):
+        pass
+    return time.perf_counter() - start
+
+
+def main(sizes):
+    """Print timings per number of lines."""
+    decoder = json_loads.__module__
+    print(f"read_jsonl decoder: {decoder}")
+    print(f"{'lines':>10} {'MB':>8} {'stdlib':>10} {'read_jsonl':>10}")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for lines in sizes:
+            filepath = os.path.join(tmpdir, f"lcsh_{lines}.jsonld")
+            write_synthetic(lines, filepath)
+            size = os.path.getsize(filepath) / 2**20
+            before = timed(read_jsonl_stdlib, filepath)
+            after = timed(read_jsonl, filepath)
+            print(f"{lines:>10} {size:>8.1f} {before:>10.3f} {after:>10.3f}")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [10000, 50000, 100000])
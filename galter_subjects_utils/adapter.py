@@ -11,6 +11,11 @@
 from .types_internal import Subject
 
 
+def strip_prefix(id_, prefix):
+    """Return `id_` minus the scheme's `prefix` (if it has it)."""
+    return id_[len(prefix):] if id_.startswith(prefix) else id_
+
+
 def converted_to_subjects(rdm_iter, prefix):
     """Adapts an RDMSubject ("Converted") iterable into a Subject iterable.
 
@@ -31,10 +36,45 @@ def converted_to_subjects(rdm_iter, prefix):
         id (minus the <prefix> part)
         label
     """
-    len_prefix = len(prefix)
     return (
-        Subject(
-            id=e["id"][len_prefix:] if e["id"].startswith(prefix) else e["id"],
-            label=e["subject"]
-        ) for e in rdm_iter
+        Subject(id=strip_prefix(e["id"], prefix), label=e["subject"])
+        for e in rdm_iter
+    )
+
+
+def rows_to_subjects(rows, prefix):
+    """Adapts an RDMSubjectRow iterable into a Subject iterable.
+
+    Like `converted_to_subjects` but for the lightweight rows streamed by
+    `get_rdm_subjects` and `read_snapshot`.
+
+    :param rows: Iterable[RDMSubjectRow]
+    :return: Iterable[Subject]
+    """
+    return (
+        Subject(id=strip_prefix(row.id, prefix), label=row.subject)
+        for row in rows
     )
+
+
+def partitioned_subjects(rows, prefixes):
+    """Partitions an RDMSubjectRow iterable into Subject lists per scheme.
+
+    :param rows: Iterable[RDMSubjectRow] (see `rows_to_subjects`)
+    :param prefixes: prefix of ids per scheme of interest
+    :type prefixes: dict[str, str]
+    :return: dict[str, list[Subject]] with a list per scheme of interest
+             (rows of other schemes are skipped)
+    """
+    result = {scheme: [] for scheme in prefixes}
+    for row in rows:
+        subjects = result.get(row.scheme)
+        if subjects is None:
+            continue
+        subjects.append(
+            Subject(
+                id=strip_prefix(row.id, prefixes[row.scheme]),
+                label=row.subject
+            )
+        )
+    return result
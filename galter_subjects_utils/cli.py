@@ -8,18 +8,32 @@
 
 """Command line tool."""
 
+import sys
 from datetime import date
 from pathlib import Path
 
 import click
 from flask.cli import with_appcontext
 
-from .contrib.lcsh.cli import lcsh
-from .contrib.mesh.cli import mesh
+from .adapter import converted_to_subjects, partitioned_subjects
+from .cliutils import option_subjects_cache_dir, with_appcontext_unless
+from .contrib.lcsh.cli import lcsh, read_lcsh_dst
+from .contrib.lcsh.scheme import LCSHScheme
+from .contrib.mesh.cli import mesh, read_mesh_dst
+from .contrib.mesh.scheme import MeSHScheme
+from .deltor import DeltasGenerator
 from .keeptrace import KeepTrace
-from .reader import read_csv
-from .updater import SubjectDeltaUpdater
-from .writer import SubjectDeltaLogger
+from .metrics import UpdateMetrics
+from .progress import ProgressReporter
+from .reader import create_scheme_index, get_rdm_subjects, read_csv_rows, \
+    read_failed_records, read_jsonl, read_snapshot
+from .scheme import Scheme
+from .snapshots import cached_rdm_subjects
+from .writer import FailureLog, PreImageJournal, SubjectDeltaLogger, \
+    deltas_header, write_csv, write_snapshot
+
+# Modules depending on Invenio are imported in the commands that need them,
+# so that file-only commands (e.g. deltas from a snapshot) work without it.
 
 
 @click.group()
@@ -39,6 +53,9 @@ defaults = {
 }
 
 
+# Columns of deltas files with few distinct values
+deltas_columns_interned = ("type", "scheme", "keep_trace")
+
 keep_trace_field_help = "Dotted field path to where trace should be kept."
 keep_trace_tmpl_help = "Template with expandable '{subject}' to be saved."
 
@@ -55,17 +72,438 @@ keep_trace_tmpl_help = "Template with expandable '{subject}' to be saved."
 )
 @click.option("--keep-trace-field", "-f", help=keep_trace_field_help)
 @click.option("--keep-trace-template", "-t", help=keep_trace_tmpl_help)
+@click.option(
+    "--journal-file", "-j",
+    type=click.Path(path_type=Path),
+    default=defaults["output-file"] / "journal_records.jsonl",
+    help="Pre-images of updated records (for rollback).",
+)
+@click.option(
+    "--overwrite-journal",
+    default=False,
+    is_flag=True,
+    help="Replace an existing journal file.",
+)
+@click.option(
+    "--metrics-file", "-m",
+    type=click.Path(path_type=Path),
+    help="Write timings and counts of the update as JSON here.",
+)
+@click.option(
+    "--progress-interval",
+    type=float,
+    default=30,
+    help="Seconds between progress reports on stderr (0 to disable).",
+)
+@click.option(
+    "--bulk-index",
+    default=False,
+    is_flag=True,
+    help="Index records in adaptive bulk requests.",
+)
+@click.option(
+    "--failures-file",
+    type=click.Path(path_type=Path),
+    default=defaults["output-file"] / "failed_records.csv",
+    help="Records that failed to commit or index (for replay).",
+)
 @with_appcontext
 def update_subjects(**parameters):
     """Update subjects in running instance according to deltas file."""
+    from invenio_records_resources.proxies import current_service_registry
+
+    from .indexing import AdaptiveBulkIndexer
+    from .updater import SubjectDeltaUpdater
+
+    journal_filepath = parameters["journal_file"]
+    if journal_filepath.exists() and not parameters["overwrite_journal"]:
+        raise click.UsageError(
+            f"Journal file {journal_filepath} exists (it may be needed to "
+            "roll back a previous update). Pass --overwrite-journal to "
+            "replace it."
+        )
+
     print(f"Updating subjects...")
-    deltas = [d for d in read_csv(parameters["deltas_file"])]
+    deltas = list(
+        read_csv_rows(
+            parameters["deltas_file"],
+            deltas_header,
+            interned=deltas_columns_interned,
+        )
+    )
     log_filepath = parameters["output_file"]
     logger = SubjectDeltaLogger(filepath=log_filepath)
     keep_trace = KeepTrace(
         field=parameters.get("keep_trace_field") or None,
         template=parameters.get("keep_trace_template") or None
     )
-    updater = SubjectDeltaUpdater(deltas, logger, keep_trace)
+    journal = PreImageJournal(
+        filepath=journal_filepath,
+        overwrite=parameters["overwrite_journal"],
+    )
+    progress_interval = parameters["progress_interval"]
+    progress = ProgressReporter(
+        stream=sys.stderr if progress_interval else None,
+        interval=progress_interval,
+    )
+    metrics = UpdateMetrics()
+    failures_filepath = parameters["failures_file"]
+    failures = FailureLog(filepath=failures_filepath)
+    indexing = None
+    if parameters["bulk_index"]:
+        indexing = AdaptiveBulkIndexer(
+            current_service_registry.get("records").indexer,
+            failures=failures,
+            metrics=metrics,
+        )
+    updater = SubjectDeltaUpdater(
+        deltas,
+        logger,
+        keep_trace,
+        journal,
+        metrics=metrics,
+        progress=progress,
+        indexing=indexing,
+        failures=failures,
+    )
     updater.update()
+    journal.close()
+    if indexing:
+        indexing.close()
+    failures.close()
+    print(updater.metrics.summary())
     print(f"Log of updated records written here {log_filepath}")
+    print(f"Log of failed records written here {failures_filepath}")
+    print(f"Journal of updated records written here {journal_filepath}")
+    metrics_filepath = parameters["metrics_file"]
+    if metrics_filepath:
+        updater.metrics.write_json(metrics_filepath)
+        print(f"Metrics of update written here {metrics_filepath}")
+
+
+@main.command("rollback")
+@click.argument(
+    "journal-file",
+    type=click.Path(path_type=Path, exists=True, dir_okay=False),
+)
+@click.option(
+    "--deltas-file", "-d",
+    type=click.Path(path_type=Path, exists=True, dir_okay=False),
+    help="Deltas file of the update to also undo changes to subjects.",
+)
+@click.option(
+    "--output-file", "-o",
+    type=click.Path(path_type=Path),
+    default=defaults["output-file"] / "rolledback_records.csv",
+)
+@click.option("--batch-size", "-b", type=int, default=200)
+@with_appcontext
+def rollback_subjects(**parameters):
+    """Restore records in running instance according to journal file."""
+    from .updater import SubjectJournalRollback
+
+    print(f"Rolling back subjects...")
+    entries = read_jsonl(parameters["journal_file"])
+    fp_of_deltas = parameters["deltas_file"]
+    deltas = (
+        list(
+            read_csv_rows(
+                fp_of_deltas,
+                deltas_header,
+                interned=deltas_columns_interned,
+            )
+        )
+        if fp_of_deltas else None
+    )
+    if deltas and any(op.get("expand") for op in deltas):
+        raise click.UsageError(
+            "Deltas file has descriptor-level (expand) ops: the qualified "
+            "subjects they removed can't be re-created."
+        )
+    log_filepath = parameters["output_file"]
+    logger = SubjectDeltaLogger(filepath=log_filepath)
+    rollback = SubjectJournalRollback(
+        entries,
+        logger,
+        ops_data=deltas,
+        batch_size=parameters["batch_size"],
+    )
+    rollback.rollback()
+    print(f"Log of restored records written here {log_filepath}")
+
+
+@main.command("replay")
+@click.argument(
+    "log-file",
+    type=click.Path(path_type=Path, exists=True, dir_okay=False),
+)
+@click.option(
+    "--deltas-file", "-d",
+    type=click.Path(path_type=Path, exists=True, dir_okay=False),
+    help="Re-apply these deltas (recommit) instead of only reindexing.",
+)
+@click.option(
+    "--output-file", "-o",
+    type=click.Path(path_type=Path),
+    default=defaults["output-file"] / "replayed_records.csv",
+)
+@click.option("--keep-trace-field", "-f", help=keep_trace_field_help)
+@click.option("--keep-trace-template", "-t", help=keep_trace_tmpl_help)
+@click.option(
+    "--failures-file",
+    type=click.Path(path_type=Path),
+    default=defaults["output-file"] / "failed_again_records.csv",
+    help="Records that failed again (for another replay).",
+)
+@click.option(
+    "--journal-file", "-j",
+    type=click.Path(path_type=Path),
+    default=defaults["output-file"] / "journal_replayed_records.jsonl",
+    help="Pre-images of recommitted records (for rollback).",
+)
+@click.option(
+    "--overwrite-journal",
+    default=False,
+    is_flag=True,
+    help="Replace an existing journal file.",
+)
+@click.option("--batch-size", "-b", type=int, default=200)
+@with_appcontext
+def replay_records(**parameters):
+    """Recommit or reindex records that failed during an update.
+
+    LOG_FILE is the failures file or the log file of the update.
+    """
+    from invenio_records_resources.proxies import current_service_registry
+
+    from .indexing import AdaptiveBulkIndexer
+    from .updater import FailedRecordsReplay
+
+    fp_of_deltas = parameters["deltas_file"]
+    journal_filepath = parameters["journal_file"]
+    # Only recommitted records are journaled
+    if (
+        fp_of_deltas and
+        journal_filepath.exists() and
+        not parameters["overwrite_journal"]
+    ):
+        raise click.UsageError(
+            f"Journal file {journal_filepath} exists (it may be needed to "
+            "roll back a previous update). Pass --overwrite-journal to "
+            "replace it."
+        )
+
+    print("Replaying records...")
+    entries = read_failed_records(parameters["log_file"])
+    deltas = (
+        list(
+            read_csv_rows(
+                fp_of_deltas,
+                deltas_header,
+                interned=deltas_columns_interned,
+            )
+        )
+        if fp_of_deltas else None
+    )
+    log_filepath = parameters["output_file"]
+    logger = SubjectDeltaLogger(filepath=log_filepath)
+    keep_trace = KeepTrace(
+        field=parameters.get("keep_trace_field") or None,
+        template=parameters.get("keep_trace_template") or None
+    )
+    journal = (
+        PreImageJournal(
+            filepath=journal_filepath,
+            overwrite=parameters["overwrite_journal"],
+        )
+        if fp_of_deltas else None
+    )
+    failures_filepath = parameters["failures_file"]
+    failures = FailureLog(filepath=failures_filepath)
+    metrics = UpdateMetrics()
+    indexing = AdaptiveBulkIndexer(
+        current_service_registry.get("records").indexer,
+        failures=failures,
+        metrics=metrics,
+    )
+    replay = FailedRecordsReplay(
+        entries,
+        logger,
+        indexing,
+        ops_data=deltas,
+        keep_trace=keep_trace,
+        journal=journal,
+        failures=failures,
+        batch_size=parameters["batch_size"],
+    )
+    with metrics.phase("replay"):
+        replay.replay()
+    indexing.close()
+    failures.close()
+    if journal:
+        journal.close()
+    print(metrics.summary())
+    print(f"Log of replayed records written here {log_filepath}")
+    print(f"Log of failed records written here {failures_filepath}")
+    if journal:
+        print(
+            f"Journal of recommitted records written here {journal_filepath}"
+        )
+
+
+@main.command("snapshot")
+@click.option(
+    "--scheme", "-s", "schemes",
+    multiple=True,
+    help="Only export subjects of this scheme (repeatable).",
+)
+@click.option(
+    "--output-file", "-o",
+    type=click.Path(path_type=Path),
+    default=defaults["output-file"] / "snapshot.csv",
+)
+@with_appcontext
+def snapshot_subjects(**parameters):
+    """Export subjects of running instance to a snapshot file.
+
+    Deltas can then be computed against it (--src-snapshot) without the
+    instance.
+    """
+    print(f"Exporting subjects...")
+    schemes = parameters["schemes"] or [None]
+    subjects = (
+        row._asdict()
+        for scheme in schemes
+        for row in get_rdm_subjects(scheme=scheme)
+    )
+    filepath = write_snapshot(subjects, parameters["output_file"])
+    print(f"Snapshot of subjects written here {filepath}")
+
+
+@main.command("index-schemes")
+@click.option(
+    "--concurrently/--no-concurrently",
+    default=True,
+    help="Build without locking writes to the subjects table.",
+)
+@with_appcontext
+def index_schemes(**parameters):
+    """Create the index serving reads of subjects by scheme."""
+    print(f"Creating index...")
+    name = create_scheme_index(concurrently=parameters["concurrently"])
+    print(f"Index {name} created (if it didn't exist)")
+
+
+@main.command("deltas")
+@click.option(
+    "--mesh-downloads-dir",
+    type=click.Path(path_type=Path),
+    help="Generate MeSH deltas out of the files downloaded here.",
+)
+@click.option("--mesh-year", type=int, default=defaults["year"])
+@click.option(
+    "--mesh-filter",
+    type=click.Choice(["topic", "topic-qualifier"]),
+    default=defaults["filter"],
+)
+@click.option(
+    "--lcsh-subjects-file",
+    type=click.Path(path_type=Path, exists=True, dir_okay=False),
+    help="Generate LCSH deltas out of this LCSH file.",
+)
+@click.option(
+    "--lcsh-replacements-file",
+    type=click.Path(path_type=Path, exists=True, dir_okay=False),
+)
+@click.option(
+    "--vocabulary", "vocabularies",
+    type=(str, click.Path(path_type=Path, exists=True, dir_okay=False)),
+    multiple=True,
+    help="SCHEME FILE: generate SCHEME deltas out of FILE (jsonl).",
+)
+@click.option(
+    "--output-dir", "-o",
+    type=click.Path(path_type=Path, file_okay=False),
+    default=defaults["output-file"],
+)
+@click.option(
+    "--src-snapshot",
+    type=click.Path(path_type=Path, exists=True, dir_okay=False),
+    help="Compare against this snapshot file instead of the instance.",
+)
+@option_subjects_cache_dir
+@with_appcontext_unless("src_snapshot")
+def deltas_subjects(**parameters):
+    """Write delta operations of several schemes to files (one per scheme).
+
+    Subjects of the instance are read once for all schemes.
+    """
+    names = [name for name, _ in parameters["vocabularies"]]
+    if parameters["mesh_downloads_dir"]:
+        names.append(MeSHScheme().name)
+    if parameters["lcsh_subjects_file"]:
+        names.append(LCSHScheme().name)
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise click.UsageError(
+            f"Scheme(s) given more than once: {', '.join(duplicates)}."
+        )
+
+    print(f"Generating deltas...")
+    jobs = []  # (scheme, dst subjects, replacements)
+    if parameters["mesh_downloads_dir"]:
+        dst, replacements = read_mesh_dst(
+            parameters["mesh_downloads_dir"].expanduser(),
+            parameters["mesh_year"],
+            parameters["mesh_filter"],
+        )
+        jobs.append((MeSHScheme(), dst, replacements))
+    if parameters["lcsh_subjects_file"]:
+        dst, replacements = read_lcsh_dst(
+            parameters["lcsh_subjects_file"],
+            parameters["lcsh_replacements_file"],
+        )
+        jobs.append((LCSHScheme(), dst, replacements))
+    for name, filepath in parameters["vocabularies"]:
+        # Local vocabularies: ids are kept whole
+        dst = converted_to_subjects(read_jsonl(filepath), prefix="")
+        jobs.append((Scheme(name=name, prefix=""), dst, {}))
+    if not jobs:
+        raise click.UsageError("No scheme to generate deltas of.")
+
+    # Source subjects of all schemes in one read
+    if parameters["src_snapshot"]:
+        subjects_rdm_preexisting = read_snapshot(parameters["src_snapshot"])
+    elif parameters["cache_dir"]:
+        subjects_rdm_preexisting = cached_rdm_subjects(parameters["cache_dir"])
+    else:
+        subjects_rdm_preexisting = get_rdm_subjects()
+    srcs = partitioned_subjects(
+        subjects_rdm_preexisting,
+        {scheme.name: scheme.prefix for scheme, _, _ in jobs},
+    )
+
+    output_dir = parameters["output_dir"]
+    output_dir.mkdir(parents=True, exist_ok=True)
+    for scheme, dst, replacements in jobs:
+        ops = (
+            DeltasGenerator(
+                src_subjects=srcs.pop(scheme.name),
+                dst_subjects=dst,
+                scheme=scheme,
+                replacements=replacements,
+            )
+            .iter_generate(
+                # only can keep trace of *those* anyway
+                yes_logic=lambda op: (
+                    op["type"] in ["rename", "replace", "remove"]
+                )
+            )
+        )
+        filepath = output_dir / f"deltas_{scheme.name.lower()}.csv"
+        write_csv(
+            ops,
+            filepath,
+            writer_kwargs={"fieldnames": deltas_header}
+        )
+        print(f"{scheme.name} deltas written here {filepath}")
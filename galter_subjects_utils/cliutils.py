@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Northwestern University.
+#
+# galter-subjects-utils is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file for more
+# details.
+
+"""Command line tool helpers."""
+
+from functools import partial, wraps
+from pathlib import Path
+
+import click
+from flask.cli import with_appcontext
+
+option_subjects_cache_dir = partial(
+    click.option(
+        "--cache-dir",
+        type=click.Path(path_type=Path, file_okay=False),
+        help=(
+            "Cache subjects of the instance here and reuse them while "
+            "they are unchanged."
+        ),
+    )
+)
+
+
+def with_appcontext_unless(parameter):
+    """Like `with_appcontext`, but not when `parameter` is given.
+
+    This lets a command that normally reads from the instance run
+    without an app (nor Invenio) when it's given a file to read instead.
+    """
+
+    def decorator(f):
+        f_with_appcontext = with_appcontext(f)
+
+        @wraps(f)
+        def _wrapped(*args, **kwargs):
+            if kwargs.get(parameter):
+                return f(*args, **kwargs)
+            return f_with_appcontext(*args, **kwargs)
+
+        return _wrapped
+
+    return decorator
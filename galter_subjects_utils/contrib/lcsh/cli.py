@@ -8,22 +8,30 @@
 
 """LCSH Command line tool."""
 
+import json
 from datetime import datetime
 from functools import partial, wraps
 from pathlib import Path
 
 import click
-from flask.cli import with_appcontext
 
-from galter_subjects_utils.adapter import converted_to_subjects
-from galter_subjects_utils.deltor import DeltasGenerator
-from galter_subjects_utils.keeptrace import KeepTrace
-from galter_subjects_utils.reader import get_rdm_subjects, read_csv, read_jsonl
-from galter_subjects_utils.writer import write_csv
+from galter_subjects_utils.adapter import converted_to_subjects, \
+    rows_to_subjects
+from galter_subjects_utils.cliutils import option_subjects_cache_dir, \
+    with_appcontext_unless
+from galter_subjects_utils.deltor import DeltasGenerator, \
+    ExternalDeltasGenerator
+from galter_subjects_utils.digests import changed_subjects, read_digests, \
+    with_digests, write_digests
+from galter_subjects_utils.reader import get_rdm_subjects, read_csv, \
+    read_csv_rows, read_jsonl_parallel, read_snapshot
+from galter_subjects_utils.snapshots import cached_rdm_subjects
+from galter_subjects_utils.writer import deltas_header, write_csv
 
 from .adapter import generate_replacements
-from .converter import LCSHRDMConverter, raw_to_deprecated
+from .converter import convert_lines, raw_to_deprecated
 from .downloader import LCSHDownloader
+from .index import build_index, index_filepath, read_topics
 from .scheme import LCSHScheme
 
 defaults = {
@@ -42,6 +50,17 @@ option_lcsh_downloads_dir = partial(
 )
 
 
+option_lcsh_workers = partial(
+    click.option(
+        "--workers",
+        "-w",
+        type=int,
+        default=1,
+        help="Processes parsing the LCSH file (0 for one per core).",
+    )
+)
+
+
 def lcsh_download_options(f):
     """Encapsulate common LCSH download options."""
 
@@ -85,13 +104,6 @@ def lcsh_download(**parameters):
     print(f"Raw LCSH files written in {parameters['downloads_dir']}/")
 
 
-def to_lcsh_converter_kwargs(downloader):
-    """Provide LCSH converter args from `downloader`."""
-    return {
-        "topics": read_jsonl(downloader.terms_filepath)
-    }
-
-
 @lcsh.command("file")
 @lcsh_download_options
 @click.option(
@@ -99,6 +111,7 @@ def to_lcsh_converter_kwargs(downloader):
     type=click.Path(path_type=Path),
     default=defaults["output-file"] / "subjects_lcsh.csv",
 )
+@option_lcsh_workers
 def lcsh_file(**parameters):
     """Generate new LCSH subjects file."""
     # Download
@@ -107,9 +120,12 @@ def lcsh_file(**parameters):
     downloader.download()
 
     # Convert
-    converter_kwargs = to_lcsh_converter_kwargs(downloader)
-    converter = LCSHRDMConverter(**converter_kwargs)
-    converted = converter.convert()
+    converted = read_jsonl_parallel(
+        downloader.terms_filepath,
+        convert_lines,
+        workers=parameters["workers"],
+        decode=False,
+    )
     # Exclude special automated geographic terms
     converted_filtered = (s for s in converted if not s["id"].endswith("-781"))
 
@@ -135,6 +151,12 @@ def lcsh_file(**parameters):
     "--since", "-s", default=None, help="Filter for YYYY-MM-DD and later."
 )
 @click.option("--output-file", "-o", type=click.Path(path_type=Path))
+@click.option(
+    "--id", "ids",
+    multiple=True,
+    help="Only consider this topic id e.g. sh85021262 (repeatable).",
+)
+@option_lcsh_workers
 def lcsh_deprecated(**parameters):
     """Generate CSV file of raw deprecated LCSH topics.
 
@@ -146,8 +168,16 @@ def lcsh_deprecated(**parameters):
     since = parameters["since"]
     since = datetime.strptime(since, "%Y-%m-%d") if since else None
 
-    topics_raw = read_jsonl(fp_of_subjects)
-    deprecations = raw_to_deprecated(topics_raw, since)
+    if parameters["ids"]:
+        # Seek straight to the topics (see `lcsh index`)
+        topics_raw = read_topics(fp_of_subjects, parameters["ids"])
+        deprecations = raw_to_deprecated(topics_raw, since)
+    else:
+        deprecations = read_jsonl_parallel(
+            fp_of_subjects,
+            partial(raw_to_deprecated, since=since),
+            workers=parameters["workers"],
+        )
 
     fp_of_deprecated = (
         parameters["output_file"] or
@@ -167,6 +197,38 @@ def lcsh_deprecated(**parameters):
     print(f"LCSH deprecated written here {fp_of_deprecated}")
 
 
+@lcsh.command("index")
+@click.argument(
+    "subjects-file",
+    type=click.Path(path_type=Path, exists=True, dir_okay=False),
+)
+def lcsh_index(**parameters):
+    """Generate byte-offset index of LCSH subjects file.
+
+    Commands reading a subset of topics then seek straight to them. The
+    index is (re)generated on demand if absent or outdated anyway.
+    """
+    fp_of_subjects = parameters["subjects_file"].expanduser()
+    index = build_index(fp_of_subjects)
+    print(
+        f"LCSH index of {len(index)} topics written here "
+        f"{index_filepath(fp_of_subjects)}"
+    )
+
+
+@lcsh.command("lookup")
+@click.argument(
+    "subjects-file",
+    type=click.Path(path_type=Path, exists=True, dir_okay=False),
+)
+@click.argument("ids", nargs=-1, required=True)
+def lcsh_lookup(**parameters):
+    """Print raw LCSH topics of IDS (e.g. sh85021262) as jsonl."""
+    fp_of_subjects = parameters["subjects_file"].expanduser()
+    for topic in read_topics(fp_of_subjects, parameters["ids"]):
+        print(json.dumps(topic))
+
+
 @lcsh.command("replacements")
 @click.argument(
     "deprecated-file",
@@ -204,6 +266,25 @@ def lcsh_replacements(**parameters):
     print(f"LCSH replacements written here {fp_of_replacements}")
 
 
+def read_lcsh_dst(fp_of_subjects, fp_of_replacements, workers=1):
+    """Return (dst subjects, replacements) out of LCSH files."""
+    lcsh = LCSHScheme()
+    converted = read_jsonl_parallel(
+        fp_of_subjects, convert_lines, workers=workers, decode=False
+    )
+    # Exclude special automated geographic terms
+    converted_filtered = (s for s in converted if not s["id"].endswith("-781"))
+    dst = converted_to_subjects(converted_filtered, prefix=lcsh.prefix)
+
+    if fp_of_replacements:
+        replacements = generate_replacements(
+            read_csv_rows(fp_of_replacements, ["subject", "new_subject"])
+        )
+    else:
+        replacements = {}
+    return dst, replacements
+
+
 @lcsh.command("deltas")
 @click.option(
     "--subjects-file",
@@ -222,64 +303,100 @@ def lcsh_replacements(**parameters):
     type=click.Path(path_type=Path),
     default=defaults["output-file"] / "deltas.csv",
 )
-@with_appcontext
+@click.option(
+    "--low-memory",
+    is_flag=True,
+    help="Sort subjects on disk to compute deltas in bounded memory.",
+)
+@click.option(
+    "--src-snapshot",
+    type=click.Path(path_type=Path, exists=True, dir_okay=False),
+    help="Compare against this snapshot file instead of the instance.",
+)
+@option_subjects_cache_dir
+@click.option(
+    "--digests-file",
+    type=click.Path(path_type=Path, dir_okay=False),
+    help=(
+        "Digests of previous run's subjects: only analyze what changed "
+        "since (the file is then updated)."
+    ),
+)
+@click.option(
+    "--full",
+    is_flag=True,
+    help="Analyze all subjects even if there are previous digests.",
+)
+@option_lcsh_workers
+@with_appcontext_unless("src_snapshot")
 def lcsh_deltas(**parameters):
     """Write LCSH subject delta operations to file."""
     print("Generating deltas...")
     lcsh = LCSHScheme()
 
     # Source subjects
-    subjects_rdm_preexisting = get_rdm_subjects(scheme=lcsh.name)
-    src = converted_to_subjects(
+    if parameters["src_snapshot"]:
+        subjects_rdm_preexisting = read_snapshot(
+            parameters["src_snapshot"], scheme=lcsh.name
+        )
+    elif parameters["cache_dir"]:
+        subjects_rdm_preexisting = cached_rdm_subjects(
+            parameters["cache_dir"], scheme=lcsh.name
+        )
+    else:
+        subjects_rdm_preexisting = get_rdm_subjects(scheme=lcsh.name)
+    src = rows_to_subjects(
         subjects_rdm_preexisting,
         prefix=lcsh.prefix,
     )
 
-    # Destination subjects
-    fp_of_subjects = parameters["subjects_file"]
-    topics_raw = read_jsonl(fp_of_subjects)
-    converted = LCSHRDMConverter(topics_raw).convert()
-    # Exclude special automated geographic terms
-    converted_filtered = (s for s in converted if not s["id"].endswith("-781"))
-    dst = converted_to_subjects(converted_filtered, prefix=lcsh.prefix)
+    # Destination subjects and replacements
+    dst, replacements = read_lcsh_dst(
+        parameters["subjects_file"],
+        parameters["replacements_file"],
+        workers=parameters["workers"],
+    )
 
-    # Replacements
-    fp_of_replacements = parameters["replacements_file"]
-    replacements_lcsh = read_csv(fp_of_replacements)
-    replacements = generate_replacements(replacements_lcsh)
+    # Incremental analysis
+    fp_of_digests = parameters["digests_file"]
+    digests = {}
+    if fp_of_digests and fp_of_digests.exists() and not parameters["full"]:
+        src, dst, digests = changed_subjects(
+            src, dst, read_digests(fp_of_digests), replacements
+        )
+    elif fp_of_digests:
+        dst = with_digests(dst, digests)
 
+    if parameters["low_memory"]:
+        generator_cls = ExternalDeltasGenerator
+    else:
+        generator_cls = DeltasGenerator
     ops = (
-        DeltasGenerator(
+        generator_cls(
             src_subjects=src,
             dst_subjects=dst,
             scheme=lcsh,
             replacements=replacements
         )
-        .generate()
-    )
-    # in-place
-    KeepTrace.mark(
-        ops,
-        # only can keep trace of *those* anyway
-        yes_logic=lambda op: op["type"] in ["rename", "replace", "remove"]
+        .iter_generate(
+            # only can keep trace of *those* anyway
+            yes_logic=lambda op: (
+                op["type"] in ["rename", "replace", "remove"]
+            )
+        )
     )
 
     fp_of_deltas = parameters["output_file"]
-    header = [
-        "id",
-        "type",
-        "scheme",
-        "subject",
-        "new_id",
-        "new_subject",
-        "keep_trace"
-    ]
     write_csv(
         ops,
         fp_of_deltas,
         writer_kwargs={
-            "fieldnames": header
+            "fieldnames": deltas_header
         }
     )
 
     print(f"LCSH deltas written here {fp_of_deltas}")
+
+    if fp_of_digests:
+        write_digests(digests, fp_of_digests)
+        print(f"Digests of subjects written here {fp_of_digests}")
@@ -8,11 +8,62 @@
 
 """Generic conversion functionality."""
 
+import json
 import re
 from datetime import datetime
 
+from galter_subjects_utils.reader import json_loads
+
 from .scheme import LCSHScheme
 
+# Only worth it over stdlib json: orjson decodes whole lines faster
+prefer_selective_extraction = json_loads is json.loads
+
+regex_for_topic_id = re.compile(r'"@id"\s*:\s*"([^"]*)"\s*}\s*$')
+regex_for_node_type = re.compile(r'"\s*,\s*"@type"\s*:\s*"([^"]*)"')
+regex_for_node_start = re.compile(r'\{\s*"@id"\s*:\s*"[^"]*$')
+_decoder = json.JSONDecoder()
+
+
+def extract_main_concept(line):
+    """Return main skos:Concept node of raw topic line (bytes).
+
+    Only that node is decoded. This relies on the serialization of LCSH
+    dumps: the topic's "@id" closes the line and nodes start with their
+    "@id" followed by their "@type".
+
+    :return: node dict, {} if the main node isn't a skos:Concept or None
+             if that can't be told without a full decode
+    """
+    s = line.decode("utf-8")
+    match = regex_for_topic_id.match(s, s.rfind('"@id"'))
+    if not match:
+        return None
+    id_suffix = match.group(1)
+
+    # The main node is the one (and only one) of id_suffix with a type
+    found = None
+    i = s.find(id_suffix)
+    while i >= 0:
+        j = i + len(id_suffix)
+        match = regex_for_node_type.match(s, j)
+        if match:
+            if found:
+                return None
+            found = (i, match.group(1))
+        i = s.find(id_suffix, j)
+
+    if not found:
+        return None
+    i, type_ = found
+    if type_ != "skos:Concept":
+        return {}
+    start = s.rfind("{", 0, i)
+    if not regex_for_node_start.match(s, start, i):
+        return None
+    node, _ = _decoder.raw_decode(s, start)
+    return node
+
 
 class LCSHRDMConverter:
     """Convert LCSH term into RDM subjects dict."""
@@ -54,7 +105,22 @@ class LCSHRDMConverter:
             ),
             None
         )
+        return self.extract_entry_of_node(info_entry)
+
+    def extract_entry_from_line(self, line):
+        """Extract relevant dict from raw LCSH skos json-ld line (bytes).
 
+        Only the main node is decoded when possible (see
+        `extract_main_concept`), the whole line otherwise.
+        """
+        if prefer_selective_extraction:
+            info_entry = extract_main_concept(line)
+            if info_entry is not None:
+                return self.extract_entry_of_node(info_entry)
+        return self.extract_entry(json_loads(line))
+
+    def extract_entry_of_node(self, info_entry):
+        """Extract relevant dict from main skos:Concept node."""
         if not info_entry:
             return {}
 
@@ -74,6 +140,28 @@ class LCSHRDMConverter:
         return entry
 
 
+def convert_topics(topics):
+    """Iterator over RDM subjects dicts of LCSH `topics`.
+
+    Picklable shorthand for `LCSHRDMConverter(topics).convert()` (see
+    `read_jsonl_parallel`).
+    """
+    return LCSHRDMConverter(topics).convert()
+
+
+def convert_lines(lines):
+    """Iterator over RDM subjects dicts of raw LCSH topic lines (bytes).
+
+    Like `convert_topics` but lines are only decoded as much as needed
+    (see `read_jsonl_parallel(..., decode=False)`).
+    """
+    converter = LCSHRDMConverter(topics=None)
+    for line in lines:
+        entry = converter.extract_entry_from_line(line)
+        if entry:
+            yield entry
+
+
 def find_main_node(topic):
     """Find main topic node among topic's skos graph.
 
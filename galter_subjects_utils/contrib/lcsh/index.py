@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Northwestern University.
+#
+# galter-subjects-utils is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file for more
+# details.
+
+"""Sidecar byte-offset index of LCSH dumps.
+
+The index maps each topic's id (e.g. "sh85021262") to the byte offset
+and length of its line in the dump, so that topics can be read without
+rereading the whole (multi-GB) dump. It's written next to the dump as
+`<dump>.idx` (CSV) and rebuilt whenever the dump is more recent.
+"""
+
+import mmap
+import os
+from pathlib import Path
+
+from galter_subjects_utils.reader import json_loads, read_csv, read_lines
+from galter_subjects_utils.writer import write_csv
+
+from .converter import regex_for_topic_id
+
+
+def topic_id(line):
+    """Return id (last part of top-level "@id") of raw topic `line`."""
+    # The topic's "@id" closes its line (after the "@graph"): only that
+    # tail is decoded
+    tail = line[line.rfind(b'"@id"'):].decode("utf-8")
+    match = regex_for_topic_id.match(tail)
+    id_ = match.group(1) if match else json_loads(line)["@id"]
+    return id_.rpartition("/")[2]
+
+
+def index_filepath(filepath):
+    """Return path of the sidecar index of dump at `filepath`."""
+    return Path(f"{filepath}.idx")
+
+
+def build_index(filepath):
+    """Index dump at `filepath` and write the sidecar index.
+
+    :return: dict of id -> (offset, length)
+    """
+    index = {
+        topic_id(line): (offset, len(line))
+        for offset, line in read_lines(filepath, offsets=True)
+        if line.strip()
+    }
+    write_csv(
+        (
+            {"id": id_, "offset": offset, "length": length}
+            for id_, (offset, length) in index.items()
+        ),
+        index_filepath(filepath),
+        writer_kwargs={"fieldnames": ["id", "offset", "length"]}
+    )
+    return index
+
+
+def load_index(filepath):
+    """Return index (id -> (offset, length)) of dump at `filepath`.
+
+    The sidecar index is read if up to date, (re)built otherwise.
+    """
+    fp_of_index = index_filepath(filepath)
+    is_fresh = (
+        fp_of_index.exists() and
+        os.path.getmtime(fp_of_index) >= os.path.getmtime(filepath)
+    )
+    if not is_fresh:
+        return build_index(filepath)
+    return {
+        e["id"]: (int(e["offset"]), int(e["length"]))
+        for e in read_csv(fp_of_index)
+    }
+
+
+def read_topics(filepath, ids, index=None):
+    """Iterate over topics of `ids` (in dump order) of dump at `filepath`.
+
+    Ids absent from the dump are skipped.
+
+    :param index: index of the dump (loaded if not given)
+    """
+    index = index or load_index(filepath)
+    locations = sorted(index[id_] for id_ in set(ids) if id_ in index)
+    if not locations:
+        return
+
+    with open(filepath, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for offset, length in locations:
+                yield json_loads(mapped[offset:offset + length])
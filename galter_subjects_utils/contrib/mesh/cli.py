@@ -13,16 +13,22 @@ from functools import wraps
 from pathlib import Path
 
 import click
-from flask.cli import with_appcontext
 
-from galter_subjects_utils.adapter import converted_to_subjects
-from galter_subjects_utils.deltor import DeltasGenerator
-from galter_subjects_utils.keeptrace import KeepTrace
-from galter_subjects_utils.reader import get_rdm_subjects, mapping_by
-from galter_subjects_utils.writer import write_csv
+from galter_subjects_utils.adapter import converted_to_subjects, \
+    rows_to_subjects
+from galter_subjects_utils.cliutils import option_subjects_cache_dir, \
+    with_appcontext_unless
+from galter_subjects_utils.deltor import DeltasGenerator, \
+    ExternalDeltasGenerator
+from galter_subjects_utils.digests import changed_subjects, read_digests, \
+    with_digests, write_digests
+from galter_subjects_utils.reader import compact_mapping_by, \
+    get_rdm_subjects, read_snapshot
+from galter_subjects_utils.snapshots import cached_rdm_subjects
+from galter_subjects_utils.writer import deltas_header, write_csv
 
 from .adapter import generate_replacements
-from .converter import MeSHRDMConverter
+from .converter import MeSHRDMConverter, compact_descriptor_ops, qualifier_keys
 from .downloader import MeSHDownloader
 from .reader import MeSHReader, MeSHReplaceReader, topic_filter
 from .scheme import MeSHScheme
@@ -60,9 +66,10 @@ def to_mesh_converter_kwargs(parameters, downloader):
         )
     if parameters["filter"] in ["topic-qualifier"]:
         result["qualifiers_mapping"] = (
-            mapping_by(
+            compact_mapping_by(
                 MeSHReader(downloader.qualifiers_filepath).read(),
-                by="QA"
+                by="QA",
+                keys=qualifier_keys,
             )
         )
 
@@ -144,6 +151,32 @@ def mesh_file(**parameters):
     print(f"MeSH terms written here {filepath}")
 
 
+def read_mesh_dst(downloads_dir, year, filter_):
+    """Return (dst subjects, replacements) out of MeSH downloaded files."""
+    mesh = MeSHScheme()
+    subjects_fp = downloads_dir / f"d{year}.bin"
+    topics = MeSHReader(subjects_fp, filter=topic_filter).read()
+
+    if filter_ == "topic-qualifier":
+        qualifiers_fp = downloads_dir / f"q{year}.bin"
+        qualifiers_mapping = compact_mapping_by(
+            MeSHReader(qualifiers_fp).read(),
+            by="QA",
+            keys=qualifier_keys,
+        )
+    else:
+        qualifiers_mapping = {}
+
+    converted = MeSHRDMConverter(topics, qualifiers_mapping).convert()
+    dst = converted_to_subjects(converted, mesh.prefix)
+
+    replace_fp = downloads_dir / f"replace{year}.txt"
+    replacements = generate_replacements(
+        MeSHReplaceReader(replace_fp).read()
+    )
+    return dst, replacements
+
+
 @mesh.command("deltas")
 @click.option(
     "--downloads-dir", "-d",
@@ -160,73 +193,106 @@ def mesh_file(**parameters):
     type=click.Path(path_type=Path),
     default=defaults["output-file"] / "deltas.csv",
 )
-@with_appcontext
+@click.option(
+    "--low-memory",
+    is_flag=True,
+    help="Sort subjects on disk to compute deltas in bounded memory.",
+)
+@click.option(
+    "--src-snapshot",
+    type=click.Path(path_type=Path, exists=True, dir_okay=False),
+    help="Compare against this snapshot file instead of the instance.",
+)
+@option_subjects_cache_dir
+@click.option(
+    "--digests-file",
+    type=click.Path(path_type=Path, dir_okay=False),
+    help=(
+        "Digests of previous run's subjects: only analyze what changed "
+        "since (the file is then updated)."
+    ),
+)
+@click.option(
+    "--full",
+    is_flag=True,
+    help="Analyze all subjects even if there are previous digests.",
+)
+@click.option(
+    "--compact",
+    is_flag=True,
+    help=(
+        "Write one remove/replace op per descriptor covering its qualified "
+        "subjects (such deltas can't be rolled back)."
+    ),
+)
+@with_appcontext_unless("src_snapshot")
 def mesh_deltas(**parameters):
     """Write MeSH subject delta operations to file."""
     print("Generating deltas...")
-    downloads_dir = parameters["downloads_dir"].expanduser()
-    year = parameters["year"]
-    filter_ = parameters["filter"]
     mesh = MeSHScheme()
 
     # Source subjects
-    subject_rdm_preexisting = get_rdm_subjects(scheme=mesh.name)
-    src = converted_to_subjects(subject_rdm_preexisting, mesh.prefix)
-
-    # Destination subjects
-    subjects_fp = downloads_dir / f"d{year}.bin"
-    topics = MeSHReader(subjects_fp, filter=topic_filter).read()
-
-    if filter_ == "topic-qualifier":
-        qualifiers_fp = downloads_dir / f"q{year}.bin"
-        qualifiers_mapping = mapping_by(
-            MeSHReader(qualifiers_fp).read(),
-            by="QA"
+    if parameters["src_snapshot"]:
+        subject_rdm_preexisting = read_snapshot(
+            parameters["src_snapshot"], scheme=mesh.name
+        )
+    elif parameters["cache_dir"]:
+        subject_rdm_preexisting = cached_rdm_subjects(
+            parameters["cache_dir"], scheme=mesh.name
         )
     else:
-        qualifiers_mapping = {}
-
-    converted = MeSHRDMConverter(topics, qualifiers_mapping).convert()
-    dst = converted_to_subjects(converted, mesh.prefix)
-
-    # Replacements
-    replace_fp = downloads_dir / f"replace{year}.txt"
-    replacements = generate_replacements(
-        MeSHReplaceReader(replace_fp).read()
+        subject_rdm_preexisting = get_rdm_subjects(scheme=mesh.name)
+    src = rows_to_subjects(subject_rdm_preexisting, mesh.prefix)
+
+    # Destination subjects and replacements
+    dst, replacements = read_mesh_dst(
+        parameters["downloads_dir"].expanduser(),
+        parameters["year"],
+        parameters["filter"],
     )
 
+    # Incremental analysis
+    fp_of_digests = parameters["digests_file"]
+    digests = {}
+    if fp_of_digests and fp_of_digests.exists() and not parameters["full"]:
+        src, dst, digests = changed_subjects(
+            src, dst, read_digests(fp_of_digests), replacements
+        )
+    elif fp_of_digests:
+        dst = with_digests(dst, digests)
+
+    if parameters["low_memory"]:
+        generator_cls = ExternalDeltasGenerator
+    else:
+        generator_cls = DeltasGenerator
     ops = (
-        DeltasGenerator(
+        generator_cls(
             src_subjects=src,
             dst_subjects=dst,
             scheme=mesh,
             replacements=replacements
         )
-        .generate()
-    )
-    # in-place
-    KeepTrace.mark(
-        ops,
-        # only can keep trace of *those* anyway
-        yes_logic=lambda op: op["type"] in ["rename", "replace", "remove"]
+        .iter_generate(
+            # only can keep trace of *those* anyway
+            yes_logic=lambda op: (
+                op["type"] in ["rename", "replace", "remove"]
+            )
+        )
     )
 
     deltas_fp = parameters["output_file"]
-    header = [
-        "id",
-        "type",
-        "scheme",
-        "subject",
-        "new_id",
-        "new_subject",
-        "keep_trace"
-    ]
+    if parameters["compact"]:
+        ops = compact_descriptor_ops(ops)
     write_csv(
         ops,
         deltas_fp,
         writer_kwargs={
-            "fieldnames": header
+            "fieldnames": deltas_header
         }
     )
 
     print(f"MeSH deltas written here {deltas_fp}")
+
+    if fp_of_digests:
+        write_digests(digests, fp_of_digests)
+        print(f"Digests of subjects written here {fp_of_digests}")
@@ -10,6 +10,9 @@
 
 from .scheme import MeSHScheme
 
+# Fields of qualifier records used in conversion
+qualifier_keys = ["UI", "SH"]
+
 
 class MeSHRDMConverter:
     """Convert MeSH term into RDM subject dict."""
@@ -19,8 +22,10 @@ class MeSHRDMConverter:
 
         :param topics: MeSH Topics iterable
         :type topics: iterable[dict]
-        :param qualifiers: MeSH qualifiers iterable, defaults to None
-        :type qualifiers: iterable[dict], optional
+        :param qualifiers_mapping: MeSH qualifiers (with at least
+                                   `qualifier_keys`) by abbreviation,
+                                   defaults to None
+        :type qualifiers_mapping: dict, optional
         """
         self.topics = topics
         self.qualifiers_mapping = qualifiers_mapping
@@ -56,3 +61,50 @@ class MeSHRDMConverter:
                     "scheme": self.mesh.name,
                     "subject": topic['MH'] + "/" + qualifier['SH']
                 }
+
+
+def compact_descriptor_ops(ops, expand="Q"):
+    """Fold qualified subject ops into descriptor-level ops.
+
+    When a descriptor is removed or replaced, so are all its qualified
+    subjects (descriptor id + qualifier id). Its op is marked with
+    `expand` so that it applies to those too at update time, and the ops
+    of qualified subjects that it covers are dropped. Other ops of
+    qualified subjects are kept: they take precedence when applied. Traces
+    kept on records by a descriptor-level op mention the descriptor.
+
+    Adds and renames are passed through as they come; removes and
+    replaces are yielded last.
+
+    :param ops: delta operations
+    :type ops: Iterable[dict]
+    :param expand: what separates descriptor id from qualifier id
+    :type expand: str
+    """
+    prefix = MeSHScheme().prefix
+    ops_to_compact = []
+    descriptor_ops = {}
+    for op in ops:
+        if op["type"] not in ["remove", "replace"]:
+            yield op
+            continue
+        ops_to_compact.append(op)
+        if expand not in op["id"][len(prefix):]:
+            op["expand"] = expand
+            descriptor_ops[op["id"]] = op
+
+    def is_covered(op):
+        """Return True if op of qualified subject is a descriptor op's."""
+        id_, _, suffix = op["id"].rpartition(expand)
+        descriptor_op = descriptor_ops.get(id_)
+        if not id_ or not descriptor_op:
+            return False
+        if op["type"] != descriptor_op["type"]:
+            return False
+        if op["type"] == "replace":
+            return op["new_id"] == descriptor_op["new_id"] + expand + suffix
+        return True
+
+    for op in ops_to_compact:
+        if "expand" in op or not is_covered(op):
+            yield op
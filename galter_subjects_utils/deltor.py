@@ -8,21 +8,57 @@
 
 """Generate delta operations."""
 
-from dataclasses import dataclass
+from contextlib import ExitStack
 
+from .extsort import ExternalSorter
+from .keeptrace import KeepTrace
 
-@dataclass
-class Analysis:
-    """
-    Holds results of analyzing a src subject.
 
-    Can't be a namedtuple because it needs to be mutable.
+class AnalysisStore:
+    """Holds results of analyzing src subjects.
+
+    Columnar: one row per src subject addressed by an integer index,
+    rather than one object per subject. Rarely set results (relabelled,
+    replaced) are kept sparsely. Ids are only kept as keys of `id_to_index`
+    (in index order): `ids()` rebuilds the index -> id column when needed.
     """
 
-    id: str
-    seen: bool = False  # present in dst subjects
-    relabelled: str = ""  # new label
-    replaced: str = ""  # id of replacing subject
+    __slots__ = (
+        "seen",
+        "relabelled",
+        "replaced",
+        "id_to_index",
+        "label_to_index",
+    )
+
+    def __init__(self):
+        """Constructor."""
+        self.seen = bytearray()  # present in dst subjects
+        self.relabelled = {}  # index -> new label
+        self.replaced = {}  # index -> id of replacing subject
+        self.id_to_index = {}
+        self.label_to_index = {}
+
+    def __len__(self):
+        """Number of rows."""
+        return len(self.seen)
+
+    def append(self, id_, label):
+        """Add row for src subject.
+
+        A repeated id is ignored (ids are unique in the instance).
+        """
+        if id_ in self.id_to_index:
+            return
+        index = len(self.seen)
+        self.seen.append(0)
+        # same int object shared by both dicts
+        self.id_to_index[id_] = index
+        self.label_to_index[label] = index
+
+    def ids(self):
+        """Return list of ids by index."""
+        return list(self.id_to_index)
 
 
 class DeltasGenerator:
@@ -46,9 +82,11 @@ class DeltasGenerator:
 
         # The below will be filled out by _analyze_src(), _analyze_dst() and
         # _analyze_replace()
-        self._id_to_analysis = {}
-        self._label_to_analysis = {}
+        self._analyses = AnalysisStore()
         self._additions = []
+        # Indexes for _analyze_replace() lookups
+        self._label_to_addition = {}
+        self._relabelled_to_index = {}
 
         # Ease of refactoring
         self.name_of_scheme = scheme.name
@@ -56,10 +94,25 @@ class DeltasGenerator:
 
     def generate(self):
         """Generate operations."""
+        return list(self.iter_generate())
+
+    def iter_generate(self, yes_logic=None):
+        """Generate operations lazily.
+
+        Analysis is done upfront, but operations are yielded one by one
+        rather than accumulated.
+
+        :param yes_logic: if given, marks each op to keep trace or not
+                          as `KeepTrace.mark` does
+        :type yes_logic: function(op_data) -> Bool
+        """
         self._analyze_src()
         self._analyze_dst()
         self._analyze_replace()
-        return self._generate_ops()
+        ops = self._generate_ops()
+        if yes_logic is None:
+            return ops
+        return (KeepTrace.mark_one(op, yes_logic) for op in ops)
 
     def _analyze_src(self):
         """Build internal analysis.
@@ -69,26 +122,35 @@ class DeltasGenerator:
         us from having to load all the self.dst_subjects as well.
         """
         for subject in self.src_subjects:
-            analysis = Analysis(id=subject.id)
-            self._id_to_analysis[subject.id] = analysis
-            self._label_to_analysis[subject.label] = analysis
+            self._analyses.append(subject.id, subject.label)
 
     def _analyze_dst(self):
         """Analyze through all dst subjects."""
+        analyses = self._analyses
+        id_to_index = analyses.id_to_index
+        label_to_index = analyses.label_to_index
         for dst_subject in self.dst_subjects:
+            index = id_to_index.get(dst_subject.id)
             # A dst subject can be
             # added/new ?
-            if dst_subject.id not in self._id_to_analysis:
+            if index is None:
                 self._additions.append(dst_subject)
+                self._label_to_addition.setdefault(
+                    dst_subject.label, dst_subject
+                )
             # relabelled ?
-            elif dst_subject.label not in self._label_to_analysis:
-                analysis = self._id_to_analysis[dst_subject.id]
-                analysis.seen = True
-                analysis.relabelled = dst_subject.label
+            elif dst_subject.label not in label_to_index:
+                analyses.seen[index] = 1
+                analyses.relabelled[index] = dst_subject.label
             # identical ?
             else:
-                analysis = self._id_to_analysis[dst_subject.id]
-                analysis.seen = True
+                analyses.seen[index] = 1
+
+        # First relabelled analysis (in src order) wins
+        for index in label_to_index.values():
+            relabelled = analyses.relabelled.get(index)
+            if relabelled:
+                self._relabelled_to_index.setdefault(relabelled, index)
 
     def _analyze_replace(self):
         """Determine which subjects have been replaced.
@@ -100,111 +162,303 @@ class DeltasGenerator:
         more cases before an abstraction can be made.
         """
 
-        def find_replacement_label(label):
-            """Return replacement label or None."""
-            new_label = self.replacements.get(label)
-            if new_label:
-                return new_label
-
-            # maybe label is qualified, so check if root is replaced
-            root_label, slash, qualifier = label.rpartition("/")
-            new_root_label = self.replacements.get(root_label)
-            if not new_root_label:
-                return None
-            new_label = new_root_label + slash + qualifier
-            return new_label
+        def id_of(index):
+            """Return id of row at `index` (id column rebuilt on demand)."""
+            if not ids:
+                ids.extend(analyses.ids())
+            return ids[index]
 
         def find_replacement_id(label):
             """Return replacement id or None if not replaced."""
-            replacement_label = find_replacement_label(label)
+            replacement_label = self._find_replacement_label(label)
             if not replacement_label:
                 return None
 
             # is replacement_label for existing and kept subject?
-            replacement_analysis = self._label_to_analysis.get(replacement_label)  # noqa
-            if replacement_analysis and replacement_analysis.seen:
-                return replacement_analysis.id
+            index = analyses.label_to_index.get(replacement_label)
+            if index is not None and analyses.seen[index]:
+                return id_of(index)
 
             # is replacement_label for newly added subject?
-            replacement_subject = next(
-                (s for s in self._additions if s.label == replacement_label),
-                None
-            )
+            replacement_subject = self._label_to_addition.get(replacement_label)  # noqa
             if replacement_subject:
                 return replacement_subject.id
 
             # is replacement_label for relabelled existing and kept subject?
-            replacement_analysis = next(
-                (
-                    a for a in self._label_to_analysis.values()
-                    if a.relabelled == replacement_label
-                ),
-                None
-            )
-            if replacement_analysis:
-                return replacement_analysis.id
+            index = self._relabelled_to_index.get(replacement_label)
+            if index is not None:
+                return id_of(index)
 
             return None
 
-        for label, analysis in self._label_to_analysis.items():
-            if analysis.seen:
+        analyses = self._analyses
+        ids = []
+        for label, index in analyses.label_to_index.items():
+            if analyses.seen[index]:
                 continue
 
             replacement_id = find_replacement_id(label)
             if replacement_id:
-                analysis.replaced = replacement_id
+                analyses.replaced[index] = replacement_id
 
-    def _generate_ops(self):
-        """Generate delta operations."""
-        result = []
+    def _find_replacement_label(self, label):
+        """Return replacement label or None."""
+        new_label = self.replacements.get(label)
+        if new_label:
+            return new_label
 
+        # maybe label is qualified, so check if root is replaced
+        root_label, slash, qualifier = label.rpartition("/")
+        new_root_label = self.replacements.get(root_label)
+        if not new_root_label:
+            return None
+        new_label = new_root_label + slash + qualifier
+        return new_label
+
+    def _generate_ops(self):
+        """Generate delta operations (lazily)."""
         # Additions
-        result.extend(
-            {
+        for a in self._additions:
+            yield {
                 "type": "add",
                 "scheme": self.name_of_scheme,
                 "id": self.generate_id(a.id),
                 "subject": a.label
             }
-            for a in self._additions
-        )
+
+        analyses = self._analyses
+        ids = analyses.ids()
+        label_to_index = analyses.label_to_index
 
         # Renames
-        result.extend(
-            {
+        for label, index in label_to_index.items():
+            relabelled = analyses.relabelled.get(index)
+            if relabelled:
+                yield {
+                    "type": "rename",
+                    "scheme": self.name_of_scheme,
+                    "id": self.generate_id(ids[index]),
+                    "subject": label,
+                    "new_subject": relabelled
+                }
+
+        # Replaces
+        for label, index in label_to_index.items():
+            replacement_id = analyses.replaced.get(index)
+            if replacement_id:
+                yield {
+                    "type": "replace",
+                    "scheme": self.name_of_scheme,
+                    "id": self.generate_id(ids[index]),
+                    "subject": label,
+                    "new_id": self.generate_id(replacement_id)
+                }
+
+        # Removes
+        for label, index in label_to_index.items():
+            if not analyses.seen[index] and index not in analyses.replaced:
+                yield {
+                    "type": "remove",
+                    "scheme": self.name_of_scheme,
+                    "id": self.generate_id(ids[index]),
+                    "subject": label
+                }
+
+
+class ExternalDeltasGenerator(DeltasGenerator):
+    """Generates deltas between subjects in bounded memory.
+
+    src and dst subjects are spilled to temporary files in sorted runs and
+    analysis is done by merging them: by id to find added, kept and
+    relabelled subjects, then by label to confirm relabellings and to
+    resolve replacements. Operations are the same as DeltasGenerator's,
+    but ordered by id within each type rather than in src/dst order.
+    Entries carry their src/dst position so that, when several subjects
+    could be the replacement, the same one as DeltasGenerator's is picked.
+
+    src subject ids are expected to be unique (as they are in the DB).
+    Duplicate dst subjects are considered once.
+    """
+
+    def __init__(
+            self,
+            src_subjects,
+            dst_subjects,
+            scheme,
+            replacements=None,
+            run_size=100_000,
+            tmpdir=None):
+        """Constructor.
+
+        :param run_size: number of entries sorted in memory at a time
+        :param tmpdir: directory of spilled runs (default: system's)
+        """
+        super().__init__(src_subjects, dst_subjects, scheme, replacements)
+        self.run_size = run_size
+        self.tmpdir = tmpdir
+
+    def iter_generate(self, yes_logic=None):
+        """Generate operations lazily.
+
+        See DeltasGenerator.iter_generate.
+        """
+        with ExitStack() as stack:
+            def sorter():
+                return stack.enter_context(
+                    ExternalSorter(self.run_size, self.tmpdir)
+                )
+
+            analysis = self._merge_by_id(sorter)
+            analysis.update(self._merge_by_label(sorter, **analysis))
+            analysis.update(self._merge_replacements(sorter, **analysis))
+
+            for op in self._merge_generate_ops(**analysis):
+                if yes_logic is not None:
+                    KeepTrace.mark_one(op, yes_logic)
+                yield op
+
+    def _merge_by_id(self, sorter):
+        """Join src and dst by id."""
+        src_by_id, src_labels, dst_by_id = sorter(), sorter(), sorter()
+        for position, subject in enumerate(self.src_subjects):
+            src_by_id.add((subject.id, position, subject.label))
+            src_labels.add(subject.label)
+        dst_by_id.extend(
+            (s.id, position, s.label)
+            for position, s in enumerate(self.dst_subjects)
+        )
+
+        additions = sorter()  # (id, dst position, label)
+        matched = sorter()  # (dst label, src position, src id, src label)
+        unseen = sorter()  # (replacement label, src id, src label)
+        removals = sorter()  # (src id, src label)
+
+        def drop(src):
+            """Account for src subject absent from dst."""
+            id_, _, label = src
+            replacement_label = self._find_replacement_label(label)
+            if replacement_label:
+                unseen.add((replacement_label, id_, label))
+            else:
+                removals.add((id_, label))
+
+        src_iter = iter(src_by_id)
+        src = next(src_iter, None)
+        src_seen = False
+        previous = None
+        for dst_id, dst_position, dst_label in dst_by_id:
+            while src is not None and src[0] < dst_id:
+                if not src_seen:
+                    drop(src)
+                src = next(src_iter, None)
+                src_seen = False
+
+            if src is not None and src[0] == dst_id:
+                # First dst subject with that id is the one considered
+                if not src_seen:
+                    matched.add((dst_label, src[1], src[0], src[2]))
+                src_seen = True
+            elif (dst_id, dst_label) != previous:
+                additions.add((dst_id, dst_position, dst_label))
+            previous = (dst_id, dst_label)
+
+        while src is not None:
+            if not src_seen:
+                drop(src)
+            src = next(src_iter, None)
+            src_seen = False
+
+        src_by_id.close()
+        dst_by_id.close()
+
+        return {
+            "src_labels": src_labels,
+            "additions": additions,
+            "matched": matched,
+            "unseen": unseen,
+            "removals": removals,
+        }
+
+    def _merge_by_label(self, sorter, src_labels, additions, matched, **_):
+        """Find relabelled subjects and candidate replacements."""
+        renames = sorter()  # (src id, src label, dst label)
+        # Candidate replacements, in order of preference: kept subject (0),
+        # added subject (1), relabelled subject (2). Ties are broken as
+        # DeltasGenerator does: last kept subject in src order, first added
+        # subject in dst order, first relabelled subject in src order.
+        targets = sorter()  # (label, preference, rank, id)
+
+        labels_iter = iter(src_labels)
+        src_label = next(labels_iter, None)
+        for dst_label, src_position, id_, label in matched:
+            targets.add((label, 0, -src_position, id_))
+            while src_label is not None and src_label < dst_label:
+                src_label = next(labels_iter, None)
+            if src_label != dst_label:
+                renames.add((id_, label, dst_label))
+                targets.add((dst_label, 2, src_position, id_))
+
+        targets.extend(
+            (label, 1, dst_position, id_)
+            for id_, dst_position, label in additions
+        )
+
+        src_labels.close()
+        matched.close()
+
+        return {"renames": renames, "targets": targets}
+
+    def _merge_replacements(self, sorter, unseen, targets, removals, **_):
+        """Resolve replacements of subjects absent from dst."""
+        replaces = sorter()  # (src id, src label, new id)
+
+        targets_iter = iter(targets)
+        target = next(targets_iter, None)
+        for replacement_label, id_, label in unseen:
+            while target is not None and target[0] < replacement_label:
+                target = next(targets_iter, None)
+            if target is not None and target[0] == replacement_label:
+                replaces.add((id_, label, target[3]))
+            else:
+                removals.add((id_, label))
+
+        unseen.close()
+        targets.close()
+        return {"replaces": replaces}
+
+    def _merge_generate_ops(
+            self, additions, renames, replaces, removals, **_):
+        """Generate delta operations (lazily) out of merged analysis."""
+        for id_, _, label in additions:
+            yield {
+                "type": "add",
+                "scheme": self.name_of_scheme,
+                "id": self.generate_id(id_),
+                "subject": label
+            }
+
+        for id_, label, new_label in renames:
+            yield {
                 "type": "rename",
                 "scheme": self.name_of_scheme,
-                "id": self.generate_id(analysis.id),
+                "id": self.generate_id(id_),
                 "subject": label,
-                "new_subject": analysis.relabelled
+                "new_subject": new_label
             }
-            for label, analysis in self._label_to_analysis.items()
-            if analysis.relabelled
-        )
 
-        # Replaces
-        result.extend(
-            {
+        for id_, label, new_id in replaces:
+            yield {
                 "type": "replace",
                 "scheme": self.name_of_scheme,
-                "id": self.generate_id(analysis.id),
+                "id": self.generate_id(id_),
                 "subject": label,
-                "new_id": self.generate_id(analysis.replaced)
+                "new_id": self.generate_id(new_id)
             }
-            for label, analysis in self._label_to_analysis.items()
-            if analysis.replaced
-        )
 
-        # Removes
-        result.extend(
-            {
+        for id_, label in removals:
+            yield {
                 "type": "remove",
                 "scheme": self.name_of_scheme,
-                "id": self.generate_id(analysis.id),
+                "id": self.generate_id(id_),
                 "subject": label
             }
-            for label, analysis in self._label_to_analysis.items()
-            if not analysis.seen and not analysis.replaced
-        )
-
-        return result
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Northwestern University.
+#
+# galter-subjects-utils is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file for more
+# details.
+
+"""Per-subject digests for incremental deltas.
+
+The digests of a run's dst subjects are kept so that the next run only
+analyzes subjects whose digest changed, that are new or that disappeared.
+This assumes the deltas of the previous run were applied to the instance:
+changes made to the instance's subjects in the meantime are only caught
+by a full run.
+"""
+
+import hashlib
+
+from .reader import read_csv
+from .writer import write_csv
+
+
+def subject_digest(subject):
+    """Return digest of what deltas compare of `subject`."""
+    return hashlib.blake2b(
+        subject.label.encode("utf-8"), digest_size=8
+    ).hexdigest()
+
+
+def with_digests(subjects, digests):
+    """Yield `subjects` while filling `digests` (id -> digest)."""
+    for subject in subjects:
+        digests[subject.id] = subject_digest(subject)
+        yield subject
+
+
+def read_digests(filepath):
+    """Return digests (id -> digest) of digests file."""
+    return {entry["id"]: entry["digest"] for entry in read_csv(filepath)}
+
+
+def write_digests(digests, filepath):
+    """Write digests (id -> digest) to digests file."""
+    return write_csv(
+        ({"id": id_, "digest": digest} for id_, digest in digests.items()),
+        filepath,
+        writer_kwargs={"fieldnames": ["id", "digest"]}
+    )
+
+
+def changed_subjects(src, dst, previous, replacements=None):
+    """Restrict src and dst subjects to those that may have changed.
+
+    Kept are dst subjects that are new or whose digest changed, and src
+    subjects of those ids or of ids that disappeared from dst. Unchanged
+    dst subjects (and their src counterparts) are kept as context when
+    their label is one of the changed labels or a replacement target (or
+    has one as root label), so that relabellings and replacements are
+    resolved as in a full run.
+
+    :param src: src subjects
+    :type src: Iterable[Subject]
+    :param dst: dst subjects
+    :type dst: Iterable[Subject]
+    :param previous: digests of previous run's dst subjects
+    :type previous: dict[str, str]
+    :param replacements: mapping of src labels to dst labels
+    :type replacements: dict[str, str]
+    :return: (src, dst, digests) where src is an iterator, dst a list (in
+             dst order) and digests the digests of all dst subjects
+    """
+    targets = set((replacements or {}).values())
+    digests = {}
+    subjects = list(with_digests(dst, digests))
+    labels = targets.union(
+        s.label for s in subjects if previous.get(s.id) != digests[s.id]
+    )
+    # Changed subjects have their label in `labels` too
+    kept = [
+        s for s in subjects
+        if s.label in labels or s.label.rpartition("/")[0] in targets
+    ]
+
+    ids = set(previous.keys() - digests.keys())
+    ids.update(s.id for s in kept)
+    return (s for s in src if s.id in ids), kept, digests
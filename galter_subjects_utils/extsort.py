@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Northwestern University.
+#
+# galter-subjects-utils is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file for more
+# details.
+
+"""External (disk-backed) sorting."""
+
+import heapq
+import pickle
+import tempfile
+
+
+class ExternalSorter:
+    """Sorts more items than fit in memory.
+
+    Items are buffered up to `run_size`, then sorted and spilled to a
+    temporary file (a "run"). Iterating merges the runs lazily, so at most
+    `run_size` items plus one item per run are in memory at a time.
+
+    Items must be picklable and comparable (e.g. tuples of str).
+    """
+
+    def __init__(self, run_size=100_000, dir=None):
+        """Constructor.
+
+        :param run_size: number of items sorted in memory at a time
+        :param dir: directory of temporary files (default: system's)
+        """
+        self._run_size = run_size
+        self._dir = dir
+        self._buffer = []
+        self._runs = []
+
+    def add(self, item):
+        """Add item to be sorted."""
+        self._buffer.append(item)
+        if len(self._buffer) >= self._run_size:
+            self._spill()
+
+    def extend(self, items):
+        """Add items to be sorted."""
+        for item in items:
+            self.add(item)
+
+    def __iter__(self):
+        """Iterate over all added items in sorted order."""
+        if self._runs and self._buffer:
+            # Only keep one item per run in memory while merging
+            self._spill()
+        self._buffer.sort()
+        return heapq.merge(
+            *(self._read_run(run) for run in self._runs),
+            self._buffer
+        )
+
+    def close(self):
+        """Discard items and remove temporary files."""
+        for run in self._runs:
+            run.close()
+        self._runs = []
+        self._buffer = []
+
+    def __enter__(self):
+        """Enter context."""
+        return self
+
+    def __exit__(self, *exc):
+        """Exit context: close."""
+        self.close()
+
+    def _spill(self):
+        """Write sorted buffer as a run."""
+        self._buffer.sort()
+        run = tempfile.TemporaryFile(dir=self._dir)
+        pickler = pickle.Pickler(run, protocol=pickle.HIGHEST_PROTOCOL)
+        # No memo: it would make the reading side keep every item alive
+        pickler.fast = True
+        for item in self._buffer:
+            pickler.dump(item)
+        self._runs.append(run)
+        self._buffer = []
+
+    @staticmethod
+    def _read_run(run):
+        """Yield items of run."""
+        run.seek(0)
+        unpickler = pickle.Unpickler(run)
+        while True:
+            try:
+                yield unpickler.load()
+            except EOFError:
+                return
@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Northwestern University.
+#
+# galter-subjects-utils is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file for more
+# details.
+
+"""Backpressure-aware bulk indexing stage."""
+
+import random
+import re
+import threading
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from invenio_search.engine import search
+
+from .metrics import UpdateMetrics
+
+expand_action = search.helpers.expand_action
+
+
+def to_index_action(indexer, record):
+    """Return bulk index action of `record` as `indexer` would index it."""
+    # Mirrors RecordIndexer.index() of invenio-indexer 2.x/3.x (those of
+    # invenio-app-rdm 12/13). There is no public API to build the action,
+    # hence the private _prepare_index, _prepare_record and _version_type:
+    # revisit on upgrade.
+    index = indexer.record_to_index(record)
+    return {
+        "_op_type": "index",
+        "_index": indexer._prepare_index(index),
+        "_id": str(record.id),
+        "_version": record.revision_id,
+        "_version_type": indexer._version_type,
+        "_source": indexer._prepare_record(record, index),
+    }
+
+
+class AdaptiveLimits:
+    """Batch size and concurrency adapted to the search cluster's feedback.
+
+    Additive increase when requests are fast, multiplicative decrease when
+    requests are rejected (429), time out or are slow. Thread-safe.
+    """
+
+    def __init__(
+            self,
+            batch_size=100,
+            min_batch_size=10,
+            max_batch_size=1000,
+            concurrency=2,
+            max_concurrency=4,
+            target_latency=2.0):
+        """Constructor.
+
+        :param target_latency: seconds above which a request is "slow"
+        """
+        self.batch_size = batch_size
+        self.min_batch_size = min_batch_size
+        self.max_batch_size = max_batch_size
+        self.concurrency = concurrency
+        self.max_concurrency = max_concurrency
+        self.target_latency = target_latency
+        self._lock = threading.Lock()
+
+    def on_success(self, latency):
+        """Adapt to a request that went through."""
+        with self._lock:
+            if latency > self.target_latency:
+                self.batch_size = max(
+                    self.min_batch_size, self.batch_size * 3 // 4
+                )
+            elif latency < self.target_latency / 2:
+                self.batch_size = min(
+                    self.max_batch_size,
+                    self.batch_size + self.min_batch_size
+                )
+                self.concurrency = min(
+                    self.max_concurrency, self.concurrency + 1
+                )
+
+    def on_pressure(self):
+        """Adapt to a rejected or timed out request."""
+        with self._lock:
+            self.batch_size = max(self.min_batch_size, self.batch_size // 2)
+            self.concurrency = max(1, self.concurrency - 1)
+
+
+def is_pressure_error(error):
+    """Return True if `error` (exception) signals an overloaded cluster."""
+    status = getattr(error, "status_code", None)
+    return status in (429, 502, 503, 504) or isinstance(
+        error, (search.exceptions.ConnectionTimeout, TimeoutError)
+    )
+
+
+class AdaptiveBulkIndexer:
+    """Indexing stage sending records to the search cluster in bulk.
+
+    Records are prepared (dumped) in the calling thread as they are added,
+    and sent in bulk requests from a small thread pool. Items rejected
+    with 429 (and requests that time out) are retried with exponential
+    backoff while batch size and concurrency are reduced. Items that still
+    fail are written to `failures` so that they can be replayed.
+    """
+
+    # Item statuses that count as indexed. 409 means that a same or more
+    # recent version is already indexed (versions are external).
+    statuses_ok = (200, 201, 409)
+    statuses_retry = (429, 502, 503, 504)
+
+    def __init__(
+            self,
+            indexer,
+            failures=None,
+            limits=None,
+            max_retries=5,
+            backoff=1.0,
+            metrics=None,
+            sleep=time.sleep,
+            clock=time.perf_counter):
+        """Constructor.
+
+        :param indexer: invenio indexer of the records
+        :param failures: where to write permanently failed records
+        :type failures: FailureLog, optional
+        :param limits: adaptive batch size/concurrency
+        :type limits: AdaptiveLimits, optional
+        :param max_retries: retries of an item before giving up
+        :param backoff: first retry delay in seconds (doubles each retry)
+        :param metrics: where to collect index latencies and errors
+        :type metrics: UpdateMetrics, optional
+        """
+        self._indexer = indexer
+        self._failures = failures
+        self.limits = limits or AdaptiveLimits()
+        self._max_retries = max_retries
+        self._backoff = backoff
+        self.metrics = metrics or UpdateMetrics()
+        self._sleep = sleep
+        self._clock = clock
+
+        self._pending = []  # [(action, (pid, id, kind))]
+        self._in_flight = set()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.limits.max_concurrency
+        )
+
+    def add(self, record, kind="record"):
+        """Queue `record` for indexing."""
+        action = to_index_action(self._indexer, record)
+        info = (record.pid.pid_value, str(record.id), kind)
+        self._pending.append((action, info))
+        if len(self._pending) >= self.limits.batch_size:
+            self._submit()
+
+    def flush(self):
+        """Send everything queued and wait for completion."""
+        if self._pending:
+            self._submit()
+        self._wait(until=0)
+
+    def close(self):
+        """Flush and release threads."""
+        self.flush()
+        self._executor.shutdown()
+
+    def _submit(self):
+        """Submit pending items as one bulk request."""
+        # Wait for a free slot according to current concurrency
+        self._wait(until=self.limits.concurrency - 1)
+        batch, self._pending = self._pending, []
+        self._in_flight.add(self._executor.submit(self._send, batch))
+
+    def _wait(self, until):
+        """Wait until at most `until` requests are in flight."""
+        while len(self._in_flight) > max(until, 0):
+            done, self._in_flight = wait(
+                self._in_flight, return_when=FIRST_COMPLETED
+            )
+            for future in done:
+                failed, latencies, counts = future.result()
+                for latency in latencies:
+                    self.metrics.observe("index", latency)
+                for name, count in counts.items():
+                    self.metrics.count(name, count)
+                for info, error in failed:
+                    self._fail(info, error)
+
+    def _fail(self, info, error):
+        """Record permanently failed item."""
+        pid, id_, kind = info
+        self.metrics.count("index_failures")
+        if self._failures:
+            self._failures.log(pid, id_, kind, stage="index", error=error)
+
+    def _send(self, batch):
+        """Send batch with retries. Runs in worker thread.
+
+        Metrics are not thread-safe, so they are returned to the calling
+        thread instead.
+
+        :return: (failed, latencies, counts) where failed is a list of
+                 (info, error) of permanently failed items
+        """
+        failed = []
+        latencies = []
+        counts = Counter()
+        attempt = 0
+        while batch:
+            retry = []
+            start = self._clock()
+            try:
+                response = self._indexer.client.bulk(
+                    body=self._to_body(action for action, _ in batch)
+                )
+            except Exception as e:
+                latencies.append(self._clock() - start)
+                counts["index_errors"] += 1
+                if not is_pressure_error(e):
+                    msg = re.sub(r"\s+", " ", str(e))
+                    failed += [(info, msg) for _, info in batch]
+                    break
+                self.limits.on_pressure()
+                retry = batch
+            else:
+                latency = self._clock() - start
+                latencies.append(latency)
+                for item, (action, info) in zip(response["items"], batch):
+                    result = next(iter(item.values()))
+                    status = result.get("status")
+                    if status in self.statuses_ok:
+                        counts["indexed"] += 1
+                        continue
+                    if status in self.statuses_retry:
+                        retry.append((action, info))
+                    else:
+                        counts["index_errors"] += 1
+                        msg = re.sub(r"\s+", " ", str(result.get("error")))
+                        failed.append((info, msg))
+                if retry:
+                    counts["index_rejections"] += len(retry)
+                    self.limits.on_pressure()
+                else:
+                    self.limits.on_success(latency)
+
+            if retry and attempt >= self._max_retries:
+                msg = f"gave up after {attempt} retries"
+                failed += [(info, msg) for _, info in retry]
+                break
+            if retry:
+                delay = self._backoff * 2 ** attempt
+                self._sleep(delay * (1 + random.random()))  # jitter
+                counts["index_retries"] += 1
+            attempt += 1
+            batch = retry
+
+        return failed, latencies, counts
+
+    @staticmethod
+    def _to_body(actions):
+        """Return bulk request body out of actions."""
+        body = []
+        for action in actions:
+            meta, source = expand_action(action)
+            body.append(meta)
+            body.append(source)
+        return body
@@ -8,6 +8,7 @@
 
 """KeepTrace."""
 
+import copy
 from dataclasses import dataclass
 
 
@@ -31,11 +32,19 @@ class KeepTrace:
         :type yes_logic: function(op_data) -> Bool
         """
         for op_data in ops_data:
-            op_data[cls.keep_trace_key] = cls.yes if yes_logic(op_data) else cls.no  # noqa
+            cls.mark_one(op_data, yes_logic)
+
+    @classmethod
+    def mark_one(cls, op_data, yes_logic):
+        """Mark op_data in-place (and return it) as `mark` does."""
+        op_data[cls.keep_trace_key] = cls.yes if yes_logic(op_data) else cls.no  # noqa
+        return op_data
 
     def should_trace(self, op_data):
         """Determine if op_data should trace."""
-        return op_data.get(self.keep_trace_key, "").lower() == self.yes.lower()
+        # A short CSV row has None for its missing keep_trace column
+        value = op_data.get(self.keep_trace_key) or ""
+        return value.lower() == self.yes.lower()
 
     def trace(self, record, subject):
         """Save expanded `self.template` at `self.field` in record."""
@@ -72,3 +81,45 @@ class KeepTrace:
         """Assign expanded template."""
         final_key = self.field.split(".")[-1]
         dict_[final_key] = self.template.format(subject=subject)
+
+    def preimage(self, record):
+        """Return what `trace` could modify in record (before it does).
+
+        This is the value of the outermost field that tracing creates or
+        changes: the final field, the first missing dict on the way or the
+        first list on the way (tracing appends to it).
+
+        :return: None if no tracing would happen, otherwise a dict
+                 {"field": <dotted path>, "value": <copy of value>}
+                 without "value" if the field is absent.
+        """
+        if not self.field or not self.template:
+            return None
+
+        obj = record
+        keys = self.field.split(".")
+        for i, key in enumerate(keys, start=1):
+            got = obj.get(key)
+            if isinstance(got, dict) and i < len(keys):
+                obj = got
+                continue
+            result = {"field": ".".join(keys[:i])}
+            if key in obj:
+                result["value"] = copy.deepcopy(got)
+            return result
+
+    @classmethod
+    def restore(cls, record, preimage):
+        """Restore in-place `preimage` (output of `preimage()`) in record."""
+        if not preimage:
+            return
+
+        *keys, final_key = preimage["field"].split(".")
+        obj = record
+        for key in keys:
+            obj = obj.setdefault(key, {})
+
+        if "value" in preimage:
+            obj[final_key] = copy.deepcopy(preimage["value"])
+        else:
+            obj.pop(final_key, None)
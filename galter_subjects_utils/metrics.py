@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Northwestern University.
+#
+# galter-subjects-utils is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file for more
+# details.
+
+"""Instrumentation of long running operations."""
+
+import json
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+
+
+class LatencyHistogram:
+    """Fixed buckets latency histogram (in seconds)."""
+
+    buckets = (
+        0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+    )
+
+    def __init__(self):
+        """Constructor."""
+        # last slot is for anything above the last bucket
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        """Record a latency."""
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    @property
+    def mean(self):
+        """Mean latency."""
+        return self.sum / self.count if self.count else 0.0
+
+    def quantile(self, q):
+        """Return upper bound of the bucket holding the `q` quantile."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        cumulated = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulated += count
+            if cumulated >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self):
+        """Return dict representation."""
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "max": self.max,
+            "mean": self.mean,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "buckets": {
+                **{
+                    f"le_{bound}": count
+                    for bound, count in zip(self.buckets, self.counts)
+                },
+                "inf": self.counts[-1],
+            },
+        }
+
+
+class UpdateMetrics:
+    """Counters, phase timers and latency histograms of an update."""
+
+    def __init__(self, clock=time.perf_counter):
+        """Constructor.
+
+        :param clock: monotonic clock returning seconds
+        :type clock: Callable[[], float]
+        """
+        self._clock = clock
+        self.counters = Counter()
+        self.phases = {}  # phase name -> seconds (in order of execution)
+        self.histograms = {}  # latency name -> LatencyHistogram
+
+    def count(self, name, n=1):
+        """Increment counter `name` by `n`."""
+        self.counters[name] += n
+
+    def observe(self, name, seconds):
+        """Record latency `seconds` in histogram `name`."""
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = LatencyHistogram()
+        histogram.observe(seconds)
+
+    @contextmanager
+    def phase(self, name):
+        """Time the enclosed block as phase `name`."""
+        start = self._clock()
+        try:
+            yield
+        finally:
+            elapsed = self._clock() - start
+            self.phases[name] = self.phases.get(name, 0.0) + elapsed
+
+    @contextmanager
+    def timer(self, name):
+        """Time the enclosed block into histogram `name`.
+
+        An exception raised in the block is counted in `<name>_errors`
+        and re-raised.
+        """
+        start = self._clock()
+        try:
+            yield
+        except Exception:
+            self.count(f"{name}_errors")
+            raise
+        finally:
+            self.observe(name, self._clock() - start)
+
+    @property
+    def elapsed(self):
+        """Total time spent in phases."""
+        return sum(self.phases.values())
+
+    def to_dict(self):
+        """Return dict representation."""
+        elapsed = self.elapsed
+        return {
+            "elapsed": elapsed,
+            "phases": dict(self.phases),
+            "counters": dict(self.counters),
+            "throughput": {
+                name: count / elapsed if elapsed else 0.0
+                for name, count in self.counters.items()
+            },
+            "latencies": {
+                name: histogram.to_dict()
+                for name, histogram in self.histograms.items()
+            },
+        }
+
+    def summary(self):
+        """Return human readable summary."""
+        elapsed = self.elapsed
+        lines = [f"Total: {elapsed:.2f}s", "Phases:"]
+        lines += [
+            f"  {name:<24} {seconds:>10.2f}s"
+            for name, seconds in self.phases.items()
+        ]
+        lines += ["Counters:"]
+        lines += [
+            f"  {name:<24} {count:>10}" + (
+                f" ({count / elapsed:.1f}/s)" if elapsed else ""
+            )
+            for name, count in self.counters.items()
+        ]
+        lines += ["Latencies:"]
+        lines += [
+            f"  {name:<24} n={h.count} mean={h.mean:.4f}s "
+            f"p50<={h.quantile(0.5):.4f}s p95<={h.quantile(0.95):.4f}s "
+            f"max={h.max:.4f}s"
+            for name, h in self.histograms.items()
+        ]
+        return "\n".join(lines)
+
+    def write_json(self, filepath):
+        """Write metrics as JSON to `filepath`."""
+        with open(filepath, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+        return filepath
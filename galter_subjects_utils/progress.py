@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Northwestern University.
+#
+# galter-subjects-utils is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file for more
+# details.
+
+"""Progress reporting of long running operations."""
+
+import time
+from datetime import timedelta
+
+
+class ProgressReporter:
+    """Periodically reports count, rate and ETA of a phase to a stream.
+
+    `advance()` is called per processed item: it only increments a counter
+    and compares it to a threshold. The clock is read every `check_every`
+    items and a line is written at most every `interval` seconds.
+    """
+
+    def __init__(
+            self, stream=None, interval=30, check_every=200,
+            clock=time.monotonic):
+        """Constructor.
+
+        :param stream: where to write progress lines (None for silence)
+        :type stream: TextIO, optional
+        :param interval: minimum number of seconds between reports
+        :type interval: float
+        :param check_every: number of items between clock reads
+        :type check_every: int
+        """
+        self._stream = stream
+        self._interval = interval
+        self._check_every = check_every
+        self._clock = clock
+        self.start("")
+
+    def start(self, label, total=None):
+        """Start reporting a new phase.
+
+        :param label: name of phase
+        :param total: estimated number of items (None if unknown)
+        """
+        self.label = label
+        self.total = total
+        self.count = 0
+        self._next_check = self._check_every
+        self._started_at = self._last_at = self._clock()
+        self._last_count = 0
+
+    def advance(self, n=1):
+        """Account for `n` more processed items."""
+        self.count += n
+        if self.count >= self._next_check:
+            self._next_check = self.count + self._check_every
+            self._maybe_report()
+
+    def finish(self):
+        """Report end of phase."""
+        if self._stream is None:
+            return
+        elapsed = self._clock() - self._started_at
+        rate = self.count / elapsed if elapsed else 0.0
+        self._write(
+            f"[{self.label}] {self.count:,} done in "
+            f"{timedelta(seconds=round(elapsed))} ({rate:,.1f}/s)"
+        )
+
+    def _maybe_report(self):
+        """Report if `interval` has passed since last report."""
+        if self._stream is None:
+            return
+        now = self._clock()
+        if now - self._last_at < self._interval:
+            return
+
+        # Current rate (since last report) reflects recent conditions better
+        rate = (self.count - self._last_count) / (now - self._last_at)
+        self._last_at = now
+        self._last_count = self.count
+        self._write(self.format(rate))
+
+    def format(self, rate):
+        """Return progress line for current state and `rate`."""
+        if not self.total or self.count > self.total:
+            return f"[{self.label}] {self.count:,} ({rate:,.1f}/s)"
+
+        percent = 100 * self.count / self.total
+        remaining = self.total - self.count
+        eta = timedelta(seconds=round(remaining / rate)) if rate else "?"
+        return (
+            f"[{self.label}] {self.count:,}/~{self.total:,} "
+            f"({percent:.1f}%) {rate:,.1f}/s ETA {eta}"
+        )
+
+    def _write(self, line):
+        """Write line to stream."""
+        self._stream.write(line + "\n")
+        self._stream.flush()
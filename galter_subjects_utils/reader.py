@@ -10,17 +10,144 @@
 
 import csv
 import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from functools import lru_cache
 
-from invenio_db import db
-from invenio_vocabularies.contrib.subjects.models import SubjectsMetadata
-from sqlalchemy import bindparam, select, text
+from sqlalchemy import bindparam, func, literal_column, select, text
 
+from .types_internal import RDMSubjectRow
 
-def read_jsonl(filepath):
-    """KISS jsonl file reader."""
-    with open(filepath) as f:
+try:
+    # Optional accelerated decoder (much faster on large dumps)
+    from orjson import loads as json_loads
+except ImportError:
+    json_loads = json.loads
+
+
+# Read buffer size of large files
+buffer_size = 1024 * 1024
+
+
+def read_lines(filepath, start=0, end=None, offsets=False):
+    """Iterate over lines (bytes, newline included) of file.
+
+    The file is read in binary mode (no text decoding pass) through a
+    large buffer.
+
+    :param start: byte offset of the first line (must start a line)
+    :param end: only lines starting before this byte offset are read
+    :param offsets: yield (byte offset, line) instead of line
+    """
+    with open(filepath, "rb", buffering=buffer_size) as f:
+        f.seek(start)
+        if end is None and not offsets:
+            yield from f
+            return
+
+        end = os.path.getsize(filepath) if end is None else end
+        offset = start
         for line in f:
-            yield json.loads(line)
+            if offset >= end:
+                break
+            if offsets:
+                yield offset, line
+            else:
+                yield line
+            offset += len(line)
+
+
+def read_jsonl(filepath):
+    """KISS jsonl file reader.
+
+    Lines are read as bytes (no text decoding pass) and parsed with orjson
+    if installed (stdlib json otherwise).
+    """
+    for line in read_lines(filepath):
+        yield json_loads(line)
+
+
+def jsonl_chunks(filepath, chunk_size=8 * 1024 * 1024):
+    """Return newline-aligned (start, end) byte ranges covering `filepath`.
+
+    Each range holds whole lines and is about `chunk_size` bytes.
+    """
+    size = os.path.getsize(filepath)
+    chunks = []
+    with open(filepath, "rb") as f:
+        start = 0
+        while start < size:
+            f.seek(min(start + chunk_size, size))
+            f.readline()  # up to the end of the current line
+            end = min(f.tell(), size)
+            chunks.append((start, end))
+            start = end
+    return chunks
+
+
+def _parse_chunk(filepath, start, end, transform, decode=True):
+    """Return `transform`ed parsed lines of `filepath`'s [start, end) range.
+
+    Runs in a worker process: `transform` must be picklable (e.g. a
+    module-level function) and results are returned as a list.
+    """
+    entries = read_lines(filepath, start, end)
+    if decode:
+        entries = (json_loads(line) for line in entries)
+    return list(transform(entries) if transform else entries)
+
+
+def read_jsonl_parallel(
+        filepath, transform=None, workers=None, ordered=True,
+        chunk_size=8 * 1024 * 1024, decode=True):
+    """Parse jsonl file in chunks across processes.
+
+    Parsing (and `transform`ing) happens in worker processes. Only a few
+    chunks per worker are in flight at a time.
+
+    :param transform: function of an iterable of parsed entries returning
+                      an iterable of results (e.g. a filter or converter).
+                      Results are yielded instead of parsed entries.
+    :param workers: number of processes (default: number of cores).
+                    1 parses in the calling process.
+    :param ordered: yield in file order. If False, chunks are yielded as
+                    soon as they are parsed.
+    :param decode: parse lines. If False, raw lines (bytes) are passed
+                   to `transform` instead e.g. to only decode what it
+                   needs.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        entries = read_jsonl(filepath) if decode else read_lines(filepath)
+        yield from transform(entries) if transform else entries
+        return
+
+    chunks = iter(jsonl_chunks(filepath, chunk_size))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        def submit_next():
+            chunk = next(chunks, None)
+            if chunk:
+                pending.append(
+                    executor.submit(
+                        _parse_chunk, filepath, *chunk, transform, decode
+                    )
+                )
+
+        pending = deque()
+        for _ in range(2 * workers):
+            submit_next()
+
+        while pending:
+            if ordered:
+                future = pending.popleft()
+            else:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                future = done.pop()
+                pending.remove(future)
+            submit_next()
+            yield from future.result()
 
 
 def read_csv(filepath, reader_kwargs=None):
@@ -31,6 +158,93 @@ def read_csv(filepath, reader_kwargs=None):
         yield from reader
 
 
+class CompactRow(tuple):
+    """Read-only dict-like row stored as a plain tuple.
+
+    Subclasses (see `compact_row_type`) map column names to positions.
+    """
+
+    __slots__ = ()
+    _positions = {}
+
+    def __getitem__(self, column):
+        """Return value of `column` (KeyError if absent)."""
+        return tuple.__getitem__(self, self._positions[column])
+
+    def get(self, column, default=None):
+        """Return value of `column` or `default` if absent."""
+        position = self._positions.get(column)
+        if position is None:
+            return default
+        return tuple.__getitem__(self, position)
+
+    def keys(self):
+        """Return column names."""
+        return self._positions.keys()
+
+
+@lru_cache(maxsize=None)
+def compact_row_type(columns):
+    """Return CompactRow subclass of `columns` (tuple of names)."""
+    positions = {column: i for i, column in enumerate(columns)}
+    return type("CompactRow", (CompactRow,), {"_positions": positions})
+
+
+def read_csv_rows(filepath, columns, interned=(), reader_kwargs=None):
+    """Stream compact rows of only `columns` out of CSV file.
+
+    Like `read_csv` but rows are CompactRow (tuples supporting `row[...]`
+    and `row.get(...)`) holding only the wanted columns. Wanted columns
+    absent from the file are absent from rows (`row.get` returns None).
+
+    :param interned: columns of few distinct values (e.g. a type) whose
+                     values are shared across rows
+    """
+    reader_kwargs = reader_kwargs or {}
+    with open(filepath) as f:
+        reader = csv.reader(f, **reader_kwargs)
+        header = next(reader, [])
+        kept = [column for column in columns if column in header]
+        positions = [header.index(column) for column in kept]
+        to_intern = [
+            header.index(column) for column in interned if column in kept
+        ]
+        row_type = compact_row_type(tuple(kept))
+        for values in reader:
+            if not values:
+                continue  # like csv.DictReader
+            values += [None] * (len(header) - len(values))
+            for i in to_intern:
+                if values[i]:
+                    values[i] = sys.intern(values[i])
+            yield row_type(values[i] for i in positions)
+
+
+def read_failed_records(filepath):
+    """Stream (deduplicated) failed records out of an update's log file.
+
+    Accepts either a FailureLog file or a SubjectDeltaLogger file (of which
+    only entries with an error are kept).
+
+    :yields: {"pid": ..., "id": ..., "kind": ...} where "id" and "kind"
+             are empty if the log doesn't have them.
+    """
+    seen = set()
+    for entry in read_csv(filepath):
+        if "stage" not in entry and not entry.get("error"):
+            continue
+        failed = {
+            "pid": entry["pid"],
+            "id": entry.get("id") or "",
+            "kind": entry.get("kind") or "",
+        }
+        key = (failed["pid"], failed["kind"])
+        if key in seen:
+            continue
+        seen.add(key)
+        yield failed
+
+
 def mapping_by(iterable, by, keys=None):
     """Return dict out of `iterable` mapped by `by` with only `keys` chosen.
 
@@ -49,10 +263,50 @@ def mapping_by(iterable, by, keys=None):
     }
 
 
-def get_rdm_subjects(scheme):
-    """Return all rdm subjects of corresponding scheme."""
-    is_scheme = (
-        text('json::json->>\'scheme\' = :scheme')
+def compact_mapping_by(iterable, by, keys):
+    """Return compact dict out of `iterable` mapped by `by` with `keys` kept.
+
+    Like `mapping_by` but keys (`by` values) are interned and values are
+    CompactRow of only `keys` (supporting `value[key]` and `value.get`)
+    instead of dict copies.
+
+    :param iterable: iterable of dict
+    :param by: key used to group
+    :param keys: keys of each dict in iterable that should be kept
+    :return: dict
+    """
+    row_type = compact_row_type(tuple(keys))
+    result = {}
+    for d in iterable:
+        key = d.get(by)
+        if isinstance(key, str):
+            key = sys.intern(key)
+        result[key] = row_type(d.get(k) for k in keys)
+    return result
+
+
+def read_snapshot(filepath, scheme=None):
+    """Stream rdm subjects (of `scheme` if given) out of a snapshot file.
+
+    A snapshot file is a CSV file with id, scheme and subject columns as
+    written by `write_snapshot`.
+
+    :yields: RDMSubjectRow (like `get_rdm_subjects`)
+    """
+    for entry in read_csv(filepath):
+        if scheme is None or entry["scheme"] == scheme:
+            yield RDMSubjectRow(entry["id"], entry["scheme"], entry["subject"])
+
+
+# Expression filtering subjects by scheme. It's on the jsonb column as is
+# (no cast) so that the expression index below can serve it.
+scheme_expression = "(json->>'scheme')"
+
+
+def is_scheme(scheme):
+    """Return SQL condition of subjects being of `scheme`."""
+    return (
+        text(f"{scheme_expression} = :scheme")
         .bindparams(
             bindparam(
                 "scheme",
@@ -61,9 +315,105 @@ def get_rdm_subjects(scheme):
         )
     )
 
+
+def get_rdm_subjects(scheme=None, batch_size=1000):
+    """Stream all rdm subjects of corresponding scheme (or all if None).
+
+    Only the id, scheme and subject fields are extracted (server-side) out
+    of the JSON of each row. Rows are fetched `batch_size` at a time
+    through a server-side cursor rather than all buffered up front.
+
+    :yields: rows with id, scheme and subject attributes (see
+             RDMSubjectRow)
+    """
+    # Imported here so that file-only functionality works without Invenio
+    from invenio_db import db
+    from invenio_vocabularies.contrib.subjects.models import SubjectsMetadata
+
+    stmt = (
+        select(
+            *(
+                literal_column(f"json->>'{field}'").label(field)
+                for field in RDMSubjectRow._fields
+            )
+        )
+        .select_from(SubjectsMetadata)
+        .execution_options(yield_per=batch_size)
+    )
+    if scheme is not None:
+        stmt = stmt.where(is_scheme(scheme))
+
+    yield from db.session.execute(stmt)
+
+
+def get_rdm_subjects_stamp(scheme=None):
+    """Return stamp of rdm subjects of corresponding scheme (or all if None).
+
+    The stamp (number of subjects and last update) changes whenever
+    subjects are added, removed or updated through Invenio.
+
+    :return: {"count": int, "updated": ISO datetime str or None}
+    """
+    from invenio_db import db
+    from invenio_vocabularies.contrib.subjects.models import SubjectsMetadata
+
     stmt = (
-        select(SubjectsMetadata.json)
-        .where(is_scheme)
+        select(func.count(), func.max(SubjectsMetadata.updated))
+        .select_from(SubjectsMetadata)
+    )
+    if scheme is not None:
+        stmt = stmt.where(is_scheme(scheme))
+
+    count, updated = db.session.execute(stmt).one()
+    return {
+        "count": count,
+        "updated": updated.isoformat() if updated else None,
+    }
+
+
+def create_scheme_index(concurrently=True):
+    """Create the expression index serving `get_rdm_subjects(scheme)`.
+
+    Creating it concurrently doesn't lock writes to the subjects table,
+    but can't happen in a transaction, so it's done on its own
+    (autocommit) connection.
+
+    :return: name of the index
+    """
+    from invenio_db import db
+    from invenio_vocabularies.contrib.subjects.models import SubjectsMetadata
+
+    table = SubjectsMetadata.__tablename__
+    name = f"ix_{table}_json_scheme"
+    concurrently = "CONCURRENTLY " if concurrently else ""
+    stmt = text(
+        f"CREATE INDEX {concurrently}IF NOT EXISTS {name} "
+        f"ON {table} ({scheme_expression})"
     )
+    with db.engine.connect() as connection:
+        connection.execution_options(
+            isolation_level="AUTOCOMMIT"
+        ).execute(stmt)
+    return name
+
+
+def estimate_row_count(model_cls):
+    """Return planner's estimate of number of rows of `model_cls`'s table.
+
+    This is cheap (no scan) but only as accurate as the last ANALYZE.
+    Return None if there is no estimate.
+    """
+    from invenio_db import db
 
-    return db.session.scalars(stmt)
+    stmt = (
+        text("SELECT reltuples FROM pg_class WHERE relname = :relname")
+        .bindparams(
+            bindparam(
+                "relname",
+                value=model_cls.__tablename__,
+            )
+        )
+    )
+    estimate = db.session.scalar(stmt)
+    # Never vacuumed/analyzed tables have -1 (or 0 in older Postgres)
+    return int(estimate) if estimate and estimate > 0 else None
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Northwestern University.
+#
+# galter-subjects-utils is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file for more
+# details.
+
+"""Cached snapshots of the instance's subjects.
+
+A cached snapshot of a scheme is reused as long as the scheme's stamp
+(number of subjects and last update) is unchanged, so that repeated
+deltas runs don't reread the subjects table. Changes made to the table
+outside of Invenio (without touching `updated`) aren't detected: remove
+the cache then.
+"""
+
+import json
+import os
+import re
+from pathlib import Path
+
+from .reader import get_rdm_subjects, get_rdm_subjects_stamp, read_snapshot
+from .writer import write_snapshot
+
+
+def cache_filepaths(cache_dir, scheme=None):
+    """Return (snapshot, stamp) filepaths of `scheme` in `cache_dir`."""
+    name = re.sub(r"\W", "_", scheme) if scheme is not None else "all"
+    cache_dir = Path(cache_dir)
+    return (
+        cache_dir / f"snapshot_{name}.csv",
+        cache_dir / f"snapshot_{name}.json",
+    )
+
+
+def read_stamp(filepath):
+    """Return stamp stored at `filepath` (None if absent or invalid)."""
+    try:
+        with open(filepath) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def cached_rdm_subjects(cache_dir, scheme=None):
+    """Stream rdm subjects of `scheme` (or all if None) through the cache.
+
+    The cached snapshot is refreshed first if its stamp doesn't match
+    the instance's.
+
+    :return: iterator of RDMSubjectRow (like `get_rdm_subjects`)
+    """
+    fp_of_snapshot, fp_of_stamp = cache_filepaths(cache_dir, scheme)
+    # Taken before reading: a change during the read is caught next time
+    stamp = {"scheme": scheme, **get_rdm_subjects_stamp(scheme)}
+
+    if not fp_of_snapshot.exists() or read_stamp(fp_of_stamp) != stamp:
+        fp_of_snapshot.parent.mkdir(parents=True, exist_ok=True)
+        fp_of_tmp = fp_of_snapshot.with_suffix(".tmp")
+        write_snapshot(
+            (row._asdict() for row in get_rdm_subjects(scheme=scheme)),
+            fp_of_tmp
+        )
+        os.replace(fp_of_tmp, fp_of_snapshot)
+        with open(fp_of_stamp, "w") as f:
+            json.dump(stamp, f)
+
+    return read_snapshot(fp_of_snapshot)
@@ -8,6 +8,7 @@
 
 """Generic download functionality."""
 
+from collections import namedtuple
 from dataclasses import dataclass
 
 
@@ -15,5 +16,12 @@ from dataclasses import dataclass
 class Subject:
     """Minimalist subject data."""
 
+    __slots__ = ("id", "label")
+
     id: str
     label: str
+
+
+# Projection of an RDMSubject on what deltas need (same fields as the rows
+# streamed by `get_rdm_subjects`)
+RDMSubjectRow = namedtuple("RDMSubjectRow", ["id", "scheme", "subject"])
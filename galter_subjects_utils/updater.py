@@ -11,6 +11,7 @@
 import copy
 import re
 from collections import OrderedDict
+from itertools import islice
 
 from invenio_access.permissions import system_identity
 from invenio_db import db
@@ -19,18 +20,40 @@ from invenio_rdm_records.records import RDMDraft, RDMRecord
 from invenio_records_resources.proxies import current_service_registry
 from invenio_records_resources.services.uow import RecordCommitOp
 from invenio_search.engine import search
-from sqlalchemy import delete, select
+from sqlalchemy import delete, or_, select
 
+from .indexing import to_index_action
 from .keeptrace import KeepTrace
+from .metrics import UpdateMetrics
+from .progress import ProgressReporter
+from .reader import estimate_row_count
 
 bulk = search.helpers.bulk
 
 
+def batched(iterable, size):
+    """Yield lists of `size` (last one may be smaller) out of `iterable`."""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
 def filter_ops_by_type(ops_data, _type):
     """Filter ops_data by _type."""
     return [op for op in ops_data if op.get("type") == _type]
 
 
+def order_ops(ops_data):
+    """Return ops_data with per-id ops before descriptor-level ones.
+
+    Per-id ops take precedence over descriptor-level ("expand") ones, so
+    they must be applied first. Done once per run, not per record.
+    """
+    exact_ops = [op for op in ops_data if not op.get("expand")]
+    expand_ops = [op for op in ops_data if op.get("expand")]
+    return exact_ops + expand_ops
+
+
 def find_idx_subject_dict(subjects, id_):
     """Return (idx, subject_dict) of subject with `id_` in `subjects`.
 
@@ -42,6 +65,31 @@ def find_idx_subject_dict(subjects, id_):
     )
 
 
+def is_targeted(subject_id, op_data):
+    """Return True if subject with `subject_id` is targeted by `op_data`.
+
+    An op with "expand" (descriptor-level op) also targets subjects whose
+    id is its id followed by "expand" and a suffix (e.g. MeSH qualified
+    subjects).
+    """
+    id_ = op_data["id"]
+    if subject_id == id_:
+        return True
+    expand = op_data.get("expand")
+    return bool(expand) and subject_id.startswith(id_ + expand)
+
+
+def find_idxs_targeted(subjects, op_data):
+    """Return indices of subjects targeted by `op_data`."""
+    if not op_data.get("expand"):
+        idx, _ = find_idx_subject_dict(subjects, op_data["id"])
+        return [idx] if idx != -1 else []
+    return [
+        i for i, s in enumerate(subjects)
+        if is_targeted(s.get("id") or "", op_data)
+    ]
+
+
 def op_replace(subjects, op_data):
     """Replace subject in-place.
 
@@ -53,19 +101,23 @@ def op_replace(subjects, op_data):
             "scheme": "...",
             "id": "...",
             "new_id": "...",
-            "new_subject": "..."
+            "new_subject": "...",
+            "expand": "..."  # optional
         }
     ```
+
+    With "expand", targeted qualified subjects are replaced by the same
+    qualification of "new_id".
     """
-    idx, subject_dict = find_idx_subject_dict(subjects, op_data["id"])
-    if idx == -1:
-        return False
-    new_subject_dict = {
-        # **subject_dict,  # probably not needed
-        "id": op_data["new_id"],
-    }
-    subjects[idx] = new_subject_dict
-    return True
+    idxs = find_idxs_targeted(subjects, op_data)
+    for idx in idxs:
+        suffix = subjects[idx]["id"][len(op_data["id"]):]
+        new_subject_dict = {
+            # **subject_dict,  # probably not needed
+            "id": op_data["new_id"] + suffix,
+        }
+        subjects[idx] = new_subject_dict
+    return bool(idxs)
 
 
 def op_remove(subjects, op_data):
@@ -78,14 +130,14 @@ def op_remove(subjects, op_data):
             "type": "remove",
             "scheme": "...",
             "id": "...",
+            "expand": "..."  # optional
         }
     ```
     """
-    idx, subject_dict = find_idx_subject_dict(subjects, op_data["id"])
-    if idx == -1:
-        return False
-    subjects.pop(idx)
-    return True
+    idxs = find_idxs_targeted(subjects, op_data)
+    for idx in reversed(idxs):
+        subjects.pop(idx)
+    return bool(idxs)
 
 
 def op_rename(subjects, op_data):
@@ -142,9 +194,23 @@ def deduplicate_subjects(subjects):
     return result
 
 
-def update_rdm_record(record, ops_data, logger, keep_trace):
-    """Apply changes to record's subjects."""
+def update_rdm_record(
+        record, ops_data, logger, keep_trace, journal=None, metrics=None,
+        indexing=None, failures=None):
+    """Apply changes to record's subjects.
+
+    If `indexing` (AdaptiveBulkIndexer) is passed, the record is queued
+    there for (bulk) indexing instead of being indexed right away.
+    If `failures` (FailureLog) is passed, a record that fails to commit or
+    index is logged there too.
+
+    `ops_data` is expected to be ordered by `order_ops`.
+    """
+    metrics = metrics or UpdateMetrics()
+    kind = "draft" if isinstance(record, RDMDraft) else "record"
     orig_subjects = copy.deepcopy(record["metadata"]["subjects"])
+    orig_trace = keep_trace.preimage(record)
+    any_applied = False
     for op_data in ops_data:
         applied = apply_op_data_change(
             op_data,
@@ -153,10 +219,23 @@ def update_rdm_record(record, ops_data, logger, keep_trace):
         )
 
         if applied:
+            any_applied = True
+            metrics.count("ops_applied")
             if keep_trace.should_trace(op_data):
                 keep_trace.trace(record, op_data["subject"])
             logger.log(record.pid.pid_value, delta=op_data)
 
+    # Journal pre-image before any side-effect
+    if journal and any_applied:
+        journal.log(
+            record.pid.pid_value,
+            id_=str(record.id),
+            kind=kind,
+            subjects=orig_subjects,
+            trace=orig_trace,
+        )
+        journal.flush()
+
     # Make sure subjects are deduplicated
     record["metadata"]["subjects"] = deduplicate_subjects(
         record["metadata"]["subjects"]
@@ -171,27 +250,47 @@ def update_rdm_record(record, ops_data, logger, keep_trace):
     # The following on_register, on_commit don't use the uow object
     # so passing None is fine
     fake_uow = None
+    stage = "commit"
     try:
-        commit_op.on_register(fake_uow)  # commits to DB
-        commit_op.on_commit(fake_uow)  # reindexes in index
+        with metrics.timer("commit"):
+            commit_op.on_register(fake_uow)  # commits to DB
+        stage = "index"
+        if indexing:
+            indexing.add(record, kind=kind)
+            # The bulk stage counts it as "indexed" once it succeeds
+            metrics.count("queued")
+        else:
+            with metrics.timer("index"):
+                commit_op.on_commit(fake_uow)  # reindexes in index
+            metrics.count("updated")
     except Exception as e:
         msg = re.sub(r"\s+", " ", str(e))
         logger.log(record.pid.pid_value, error=msg)
+        if failures:
+            failures.log(
+                record.pid.pid_value, str(record.id), kind, stage, error=msg
+            )
     finally:
         logger.flush()
 
 
-def get_records_to_update(ops_data, data_cls):
-    """Return data-layer records to update."""
+def get_records_to_update(ops_data, data_cls, metrics=None, progress=None):
+    """Return data-layer records to update.
 
-    def get_targeted_ids(ops_data):
+    Scanned and matched records are counted in `metrics` (if passed) as
+    they are iterated over. Scanned records advance `progress` (if passed).
+    """
+    metrics = metrics or UpdateMetrics()
+    progress = progress or ProgressReporter()
+
+    def get_targeted_ops(ops_data):
         return [
-            op["id"] for op in ops_data
+            op for op in ops_data
             if op.get("type") in ["replace", "remove", "rename"]
         ]
 
-    def has_at_least_1_subject_targeted(record_data_db, ids):
-        """Return True if `record_data_db` has at least 1 subject in `ids`.
+    def has_at_least_1_subject_targeted(record_data_db, is_targeted_id):
+        """Return True if `record_data_db` has at least 1 targeted subject.
 
         Because of cases where there are 100K+ subjects, we can't construct
         queries filtering at the DB level. We do the filtering in memory,
@@ -203,44 +302,187 @@ def get_records_to_update(ops_data, data_cls):
         if not record_data_db:
             return False
         subjects = record_data_db.get("metadata", {}).get("subjects", [])
-        return any(s.get("id") in ids for s in subjects)
+        return any(is_targeted_id(s.get("id")) for s in subjects)
 
-    targeted_ids = frozenset(get_targeted_ids(ops_data))
+    targeted_ops = get_targeted_ops(ops_data)
+    targeted_ids = frozenset(op["id"] for op in targeted_ops)
+    # Descriptor-level ops target ids starting with id + expand
+    targeted_prefixes = frozenset(
+        op["id"] + op["expand"] for op in targeted_ops if op.get("expand")
+    )
+    expands = frozenset(
+        op["expand"] for op in targeted_ops if op.get("expand")
+    )
 
     if not targeted_ids:
         return []
 
+    def is_targeted_id(id_):
+        if id_ in targeted_ids:
+            return True
+        for expand in expands:
+            idx = id_.rfind(expand) if id_ else -1
+            if idx > 0 and id_[:idx + len(expand)] in targeted_prefixes:
+                return True
+        return False
+
     stmt = (
         select(data_cls.model_cls)
         .execution_options(yield_per=200)  # could be made adjustable
     )
 
-    result = (
-        data_cls(obj.data, model=obj) for obj
-        in db.session.scalars(stmt)
-        if has_at_least_1_subject_targeted(obj.data, targeted_ids)
-    )
+    def filter_targeted(objs):
+        for obj in objs:
+            metrics.count("scanned")
+            progress.advance()
+            if has_at_least_1_subject_targeted(obj.data, is_targeted_id):
+                metrics.count("matched")
+                yield data_cls(obj.data, model=obj)
+
+    return filter_targeted(db.session.scalars(stmt))
+
+
+def find_rdm_subject_ids_by_prefix(prefixes):
+    """Return ids of the Subjects entries starting with any of `prefixes`."""
+    ids = []
+    for batch in batched(prefixes, 200):
+        stmt = (
+            select(PersistentIdentifier.pid_value)
+            .where(PersistentIdentifier.pid_type == "sub")
+            .where(
+                or_(*(
+                    PersistentIdentifier.pid_value.startswith(
+                        prefix, autoescape=True
+                    )
+                    for prefix in batch
+                ))
+            )
+        )
+        ids.extend(db.session.scalars(stmt))
+    return ids
 
-    return result
+
+def remove_rdm_subjects(ids_for_removal):
+    """Remove subjects with `ids_for_removal` from the Subjects entries.
+
+    We have to resort to low-level commands because the high-level ones
+    are not made for bulk operations. We've checked the implications
+    and we should be fine (at least at time of writing).
+    """
+    service = current_service_registry.get("subjects")
+
+    model_cls = service.record_cls.model_cls
+    size_of_batch = 200  # Maybe TODO: make configurable
+    for offset in range(0, len(ids_for_removal), size_of_batch):
+        batch = ids_for_removal[offset:offset + size_of_batch]
+
+        # Delete from database
+        # ===
+        # Get ids of model class
+        # The ids_for_removal internally correspond to
+        # pids, so they need to be dereferenced first
+        stmt_to_select_ids = (
+            select(model_cls.id)
+            .where(model_cls.id == PersistentIdentifier.object_uuid)
+            .where(PersistentIdentifier.pid_type == "sub")
+            .where(PersistentIdentifier.pid_value.in_(batch))
+        )
+        ids_of_model_cls = list(db.session.scalars(stmt_to_select_ids))
+
+        # Delete subject records
+        stmt_to_delete_subjects = (
+            delete(model_cls)
+            .where(model_cls.id.in_(ids_of_model_cls))
+            # ORM session synchronization has to be specified when deleting
+            # Here we skip synchronization since not needed
+            .execution_options(synchronize_session=False)
+        )
+        db.session.execute(stmt_to_delete_subjects)
+
+        # Delete backing subject PID
+        stmt_to_delete_pids = (
+            delete(PersistentIdentifier)
+            .where(PersistentIdentifier.pid_type == "sub")
+            .where(PersistentIdentifier.pid_value.in_(batch))
+            .execution_options(synchronize_session=False)
+        )
+        db.session.execute(stmt_to_delete_pids)
+
+        db.session.commit()
+
+        # Delete from document engine
+        # ===
+        alias_of_index = service.record_cls.index.search_alias
+        bulk(
+            service.indexer.client,
+            (
+                {
+                    "_op_type": "delete",
+                    "_index": alias_of_index,
+                    "_id": id_
+                }
+                for id_ in ids_of_model_cls
+            ),
+        )
+
+
+def bulk_index_records(indexer, records):
+    """Index `records` in one bulk request.
+
+    :return: list of (id, error) for the records that failed to index.
+    """
+    _, errors = bulk(
+        indexer.client,
+        (to_index_action(indexer, r) for r in records),
+        raise_on_error=False,
+        raise_on_exception=False,
+    )
+    return [
+        (info.get("_id"), re.sub(r"\s+", " ", str(info.get("error"))))
+        for error in errors
+        for info in error.values()
+    ]
 
 
 class SubjectDeltaUpdater:
     """Translates delta operations into actual changes."""
 
-    def __init__(self, ops_data, logger, keep_trace):
-        """Constructor."""
-        self._ops_data = ops_data
+    def __init__(
+            self, ops_data, logger, keep_trace, journal=None, metrics=None,
+            progress=None, indexing=None, failures=None):
+        """Constructor.
+
+        :param journal: where to keep pre-images of updated records
+        :type journal: PreImageJournal, optional
+        :param metrics: where to collect timings and counts
+        :type metrics: UpdateMetrics, optional
+        :param progress: where to report progress of records scan
+        :type progress: ProgressReporter, optional
+        :param indexing: bulk indexing stage (default: index each record)
+        :type indexing: AdaptiveBulkIndexer, optional
+        :param failures: where to log records that failed to commit/index
+        :type failures: FailureLog, optional
+        """
+        self._ops_data = order_ops(ops_data)
         self._logger = logger
         self._keep_trace = keep_trace
+        self._journal = journal
+        self.metrics = metrics or UpdateMetrics()
+        self._progress = progress or ProgressReporter()
+        self._indexing = indexing
+        self._failures = failures
 
     def update(self):
         """Execute changes."""
-        self._add_rdm_subjects()
-        self._rename_rdm_subjects()
+        with self.metrics.phase("add_subjects"):
+            self._add_rdm_subjects()
+        with self.metrics.phase("rename_subjects"):
+            self._rename_rdm_subjects()
 
         self._update_rdm_records()
 
-        self._remove_rdm_subjects()
+        with self.metrics.phase("remove_subjects"):
+            self._remove_rdm_subjects()
 
     def _add_rdm_subjects(self):
         """Add to the Subjects entries."""
@@ -255,6 +497,7 @@ class SubjectDeltaUpdater:
                     "subject": op["subject"],
                 }
             )
+            self.metrics.count("subjects_added")
 
     def _rename_rdm_subjects(self):
         """Rename subjects in the Subjects entries."""
@@ -270,91 +513,355 @@ class SubjectDeltaUpdater:
                     "subject": op["new_subject"]
                 }
             )
+            self.metrics.count("subjects_renamed")
 
     def _update_rdm_records(self):
         """Execute operations (replace/remove/rename) on RDM records."""
-        entries = get_records_to_update(self._ops_data, data_cls=RDMRecord)
-        for record in entries:
-            update_rdm_record(
-                record,
-                ops_data=self._ops_data,
-                logger=self._logger,
-                keep_trace=self._keep_trace
+        with self.metrics.phase("update_records"):
+            self._progress.start(
+                "records", estimate_row_count(RDMRecord.model_cls)
             )
+            entries = get_records_to_update(
+                self._ops_data,
+                data_cls=RDMRecord,
+                metrics=self.metrics,
+                progress=self._progress,
+            )
+            for record in entries:
+                update_rdm_record(
+                    record,
+                    ops_data=self._ops_data,
+                    logger=self._logger,
+                    keep_trace=self._keep_trace,
+                    journal=self._journal,
+                    metrics=self.metrics,
+                    indexing=self._indexing,
+                    failures=self._failures,
+                )
+            if self._indexing:
+                self._indexing.flush()
+            self._progress.finish()
 
         # Don't keep trace for drafts
-        entries = get_records_to_update(self._ops_data, data_cls=RDMDraft)
-        for draft in entries:
-            update_rdm_record(
-                draft,
-                ops_data=self._ops_data,
-                logger=self._logger,
-                keep_trace=KeepTrace(None, None)  # noop KeepTrace
+        with self.metrics.phase("update_drafts"):
+            self._progress.start(
+                "drafts", estimate_row_count(RDMDraft.model_cls)
+            )
+            entries = get_records_to_update(
+                self._ops_data,
+                data_cls=RDMDraft,
+                metrics=self.metrics,
+                progress=self._progress,
             )
+            for draft in entries:
+                update_rdm_record(
+                    draft,
+                    ops_data=self._ops_data,
+                    logger=self._logger,
+                    keep_trace=KeepTrace(None, None),  # noop KeepTrace
+                    journal=self._journal,
+                    metrics=self.metrics,
+                    indexing=self._indexing,
+                    failures=self._failures,
+                )
+            if self._indexing:
+                self._indexing.flush()
+            self._progress.finish()
 
     def _remove_rdm_subjects(self):
-        """Remove subjects from the Subjects entries.
+        """Remove subjects from the Subjects entries."""
+        ops = [
+            op for op in self._ops_data
+            if op.get("type") in ["remove", "replace"]
+        ]
+        ids_for_removal = [op["id"] for op in ops]
+        # Qualified subjects of descriptor-level ops
+        ids_for_removal += find_rdm_subject_ids_by_prefix(
+            [op["id"] + op["expand"] for op in ops if op.get("expand")]
+        )
+        ids_for_removal = list(dict.fromkeys(ids_for_removal))
+        remove_rdm_subjects(ids_for_removal)
+        self.metrics.count("subjects_removed", len(ids_for_removal))
+
+
+class SubjectJournalRollback:
+    """Restores records (and optionally subjects) from a pre-image journal.
 
-        We have to resort to low-level commands because the high-level ones
-        are not made for bulk operations. We've checked the implications
-        and we should be fine (at least at time of writing).
+    Records are restored in batches: one DB commit and one bulk index
+    request per batch.
+    """
+
+    def __init__(self, entries, logger, ops_data=None, batch_size=200):
+        """Constructor.
+
+        :param entries: entries of a PreImageJournal
+        :type entries: Iterable[dict]
+        :param logger: logger of restored records
+        :type logger: SubjectDeltaLogger
+        :param ops_data: deltas that led to the journal. If passed, the
+                         changes to the Subjects entries are undone too.
+                         Descriptor-level ("expand") ops are refused: the
+                         qualified subjects they removed can't be re-created.
+        :type ops_data: List[dict], optional
+        :param batch_size: number of records per DB commit / bulk request
+        :type batch_size: int
         """
-        ids_for_removal = [
-            op["id"] for op in self._ops_data
+        self._ops_data = ops_data or []
+        if any(op.get("expand") for op in self._ops_data):
+            raise ValueError(
+                "Rollback of descriptor-level (expand) ops is not supported."
+            )
+        self._entries = entries
+        self._logger = logger
+        self._batch_size = batch_size
+
+    def rollback(self):
+        """Execute rollback."""
+        # Removed subjects must exist again before records refer to them
+        self._readd_rdm_subjects()
+        self._unrename_rdm_subjects()
+
+        self._restore_rdm_records()
+
+        self._unadd_rdm_subjects()
+
+    def _readd_rdm_subjects(self):
+        """Re-create removed/replaced subjects in the Subjects entries."""
+        service = current_service_registry.get("subjects")
+        record_cls = service.record_cls
+        ops = [
+            op for op in self._ops_data
             if op.get("type") in ["remove", "replace"]
         ]
-        service = current_service_registry.get("subjects")
-
-        model_cls = service.record_cls.model_cls
-        size_of_batch = 200  # Maybe TODO: make configurable
-        for offset in range(0, len(ids_for_removal), size_of_batch):
-            batch = ids_for_removal[offset:offset + size_of_batch]
-
-            # Delete from database
-            # ===
-            # Get ids of model class
-            # The ids_for_removal internally correspond to
-            # pids, so they need to be dereferenced first
-            stmt_to_select_ids = (
-                select(model_cls.id)
-                .where(model_cls.id == PersistentIdentifier.object_uuid)
+        for batch in batched(ops, self._batch_size):
+            stmt = (
+                select(PersistentIdentifier.pid_value)
                 .where(PersistentIdentifier.pid_type == "sub")
-                .where(PersistentIdentifier.pid_value.in_(batch))
-            )
-            ids_of_model_cls = list(db.session.scalars(stmt_to_select_ids))
-
-            # Delete subject records
-            stmt_to_delete_subjects = (
-                delete(model_cls)
-                .where(model_cls.id.in_(ids_of_model_cls))
-                # ORM session synchronization has to be specified when deleting
-                # Here we skip synchronization since not needed
-                .execution_options(synchronize_session=False)
+                .where(
+                    PersistentIdentifier.pid_value.in_(
+                        [op["id"] for op in batch]
+                    )
+                )
             )
-            db.session.execute(stmt_to_delete_subjects)
+            ids_existing = set(db.session.scalars(stmt))
+
+            # Like service.create, but one DB commit and one bulk index
+            # request per batch
+            created = []
+            for op in batch:
+                if op["id"] in ids_existing:
+                    continue
+                ids_existing.add(op["id"])  # same subject in several ops
+                with db.session.begin_nested():
+                    subject = record_cls.create(
+                        {
+                            "id": op["id"],
+                            "scheme": op["scheme"],
+                            "subject": op["subject"],
+                        }
+                    )
+                    record_cls.pid.create(subject)
+                    subject.commit()
+                created.append(subject)
+            db.session.commit()
 
-            # Delete backing subject PID
-            stmt_to_delete_pids = (
-                delete(PersistentIdentifier)
-                .where(PersistentIdentifier.pid_type == "sub")
-                .where(PersistentIdentifier.pid_value.in_(batch))
-                .execution_options(synchronize_session=False)
+            pids = {str(subject.id): subject["id"] for subject in created}
+            for id_, error in bulk_index_records(service.indexer, created):
+                self._logger.log(pids.get(id_, id_), error=error)
+                self._logger.flush()
+
+    def _unrename_rdm_subjects(self):
+        """Give back former labels in the Subjects entries."""
+        service = current_service_registry.get("subjects")
+        rename_ops = filter_ops_by_type(self._ops_data, "rename")
+        for op in rename_ops:
+            service.update(
+                system_identity,
+                op["id"],
+                {
+                    "id": op["id"],
+                    "scheme": op["scheme"],
+                    "subject": op["subject"]
+                }
             )
-            db.session.execute(stmt_to_delete_pids)
 
-            db.session.commit()
+    def _restore_rdm_records(self):
+        """Restore pre-images of records and drafts."""
+        records_service = current_service_registry.get("records")
+        indexer = records_service.indexer
+
+        # Earliest pre-image of a record is the one to restore
+        handled = set()  # (id, kind)
+        for batch in batched(self._entries, self._batch_size):
+            for kind, data_cls in [("record", RDMRecord), ("draft", RDMDraft)]:
+                entries = {}
+                for e in batch:
+                    if e["kind"] == kind and (e["id"], kind) not in handled:
+                        entries.setdefault(e["id"], e)
+                handled.update((id_, kind) for id_ in entries)
+                if not entries:
+                    continue
+
+                restored = []
+                for record in data_cls.get_records(list(entries)):
+                    entry = entries.pop(str(record.id))
+                    KeepTrace.restore(record, entry.get("trace"))
+                    record["metadata"]["subjects"] = entry["subjects"]
+                    try:
+                        with db.session.begin_nested():
+                            record.commit()
+                        restored.append(record)
+                    except Exception as e:
+                        msg = re.sub(r"\s+", " ", str(e))
+                        self._logger.log(entry["pid"], error=msg)
+                        self._logger.flush()
+                db.session.commit()
+
+                errors = dict(bulk_index_records(indexer, restored))
+                for record in restored:
+                    self._logger.log(
+                        record.pid.pid_value,
+                        error=errors.get(str(record.id))
+                    )
+                    self._logger.flush()
+
+                # Left over entries were not found
+                for entry in entries.values():
+                    self._logger.log(entry["pid"], error=f"{kind} not found")
+                    self._logger.flush()
+
+    def _unadd_rdm_subjects(self):
+        """Remove added subjects from the Subjects entries."""
+        remove_rdm_subjects(
+            [op["id"] for op in filter_ops_by_type(self._ops_data, "add")]
+        )
 
-            # Delete from document engine
-            # ===
-            alias_of_index = service.record_cls.index.search_alias
-            bulk(
-                service.indexer.client,
-                (
-                    {
-                        "_op_type": "delete",
-                        "_index": alias_of_index,
-                        "_id": id_
-                    }
-                    for id_ in ids_of_model_cls
+
+class FailedRecordsReplay:
+    """Replays records that failed to commit or index during an update.
+
+    Records are loaded in batches. Each record is either re-updated
+    according to the deltas (if `ops_data` is passed) or just reindexed.
+    Indexing goes through the bulk indexing stage.
+    """
+
+    def __init__(
+            self, entries, logger, indexing, ops_data=None, keep_trace=None,
+            journal=None, failures=None, batch_size=200):
+        """Constructor.
+
+        :param entries: failed records {"pid": ..., "id": ..., "kind": ...}
+                        where "id" and "kind" may be empty (unknown)
+        :type entries: Iterable[dict]
+        :param logger: logger of replayed records
+        :type logger: SubjectDeltaLogger
+        :param indexing: bulk indexing stage
+        :type indexing: AdaptiveBulkIndexer
+        :param ops_data: deltas to re-apply (recommit) or None (reindex)
+        :type ops_data: List[dict], optional
+        :param keep_trace: keep trace of re-applied deltas on records
+        :type keep_trace: KeepTrace, optional
+        :param journal: where to keep pre-images of re-updated records
+        :type journal: PreImageJournal, optional
+        :param failures: where to log records that fail again
+        :type failures: FailureLog, optional
+        :param batch_size: number of records loaded/committed at once
+        :type batch_size: int
+        """
+        self._entries = entries
+        self._logger = logger
+        self._indexing = indexing
+        self._ops_data = order_ops(ops_data) if ops_data else ops_data
+        self._keep_trace = keep_trace or KeepTrace(None, None)
+        self._journal = journal
+        self._failures = failures
+        self._batch_size = batch_size
+
+    def replay(self):
+        """Execute replay."""
+        for batch in batched(self._entries, self._batch_size):
+            ids = self._resolve_ids(batch)
+            found = set()  # (record uuid, kind)
+            for kind, data_cls in [("record", RDMRecord), ("draft", RDMDraft)]:
+                ids_of_kind = [
+                    ids[e["pid"]] for e in batch
+                    if e["pid"] in ids and e.get("kind") in (kind, "", None)
+                ]
+                if not ids_of_kind:
+                    continue
+                for record in data_cls.get_records(ids_of_kind):
+                    found.add((str(record.id), kind))
+                    self._replay_record(record, kind)
+                db.session.commit()
+            self._log_not_found(batch, ids, found)
+
+        self._indexing.flush()
+
+    def _log_not_found(self, entries, ids, found):
+        """Log `entries` whose record/draft couldn't be loaded."""
+        for entry in entries:
+            id_ = ids.get(entry["pid"])
+            kinds = [entry["kind"]] if entry.get("kind") else [
+                "record", "draft"
+            ]
+            if id_ and any((id_, kind) in found for kind in kinds):
+                continue
+            kind = entry.get("kind") or "record"
+            msg = f"{kind} not found"
+            self._logger.log(entry["pid"], error=msg)
+            self._logger.flush()
+            if self._failures:
+                self._failures.log(
+                    entry["pid"], id_ or "", entry.get("kind") or "", "load",
+                    msg
+                )
+
+    def _resolve_ids(self, entries):
+        """Return {pid: record uuid} for `entries`."""
+        ids = {e["pid"]: e["id"] for e in entries if e.get("id")}
+        pids_unresolved = [e["pid"] for e in entries if not e.get("id")]
+        if pids_unresolved:
+            stmt = (
+                select(
+                    PersistentIdentifier.pid_value,
+                    PersistentIdentifier.object_uuid,
+                )
+                .where(PersistentIdentifier.pid_type == "recid")
+                .where(PersistentIdentifier.pid_value.in_(pids_unresolved))
+            )
+            ids.update(
+                (pid, str(uuid)) for pid, uuid in db.session.execute(stmt)
+            )
+        return ids
+
+    def _replay_record(self, record, kind):
+        """Recommit or reindex `record`."""
+        if self._ops_data:
+            update_rdm_record(
+                record,
+                ops_data=self._ops_data,
+                logger=self._logger,
+                # Don't keep trace for drafts
+                keep_trace=(
+                    self._keep_trace if kind == "record"
+                    else KeepTrace(None, None)
                 ),
+                journal=self._journal,
+                indexing=self._indexing,
+                failures=self._failures,
             )
+            return
+
+        try:
+            self._indexing.add(record, kind=kind)
+        except Exception as e:
+            msg = re.sub(r"\s+", " ", str(e))
+            self._logger.log(record.pid.pid_value, error=msg)
+            if self._failures:
+                self._failures.log(
+                    record.pid.pid_value, str(record.id), kind, "index", msg
+                )
+        else:
+            self._logger.log(record.pid.pid_value)
+        finally:
+            self._logger.flush()
@@ -14,6 +14,19 @@ from datetime import datetime
 from io import StringIO
 from pathlib import Path
 
+# Columns of deltas files: written by the deltas commands and read by
+# update/rollback/replay. "expand" is only set by descriptor-level ops.
+deltas_header = (
+    "id",
+    "type",
+    "scheme",
+    "subject",
+    "new_id",
+    "new_subject",
+    "keep_trace",
+    "expand",
+)
+
 
 def write_jsonl(
     entries,
@@ -42,6 +55,22 @@ def write_csv(entries, filepath, writer_kwargs=None):
     return filepath
 
 
+def write_snapshot(subjects, filepath):
+    """Write rdm subjects to a snapshot file.
+
+    Only the id, scheme and subject fields are kept: this is what's needed
+    to compute deltas against.
+    """
+    return write_csv(
+        subjects,
+        filepath,
+        writer_kwargs={
+            "fieldnames": ["id", "scheme", "subject"],
+            "extrasaction": "ignore",
+        }
+    )
+
+
 class SubjectDeltaLogger:
     """Convenience logger for delta operations applied to records."""
 
@@ -124,3 +153,107 @@ class SubjectDeltaLogger:
         result = [e for e in csv.DictReader(self.f)]
         self.f.seek(offset)
         return result
+
+
+class PreImageJournal:
+    """Journal of records' pre-update subjects (and traced field).
+
+    One compact JSON line per updated record:
+
+    ```python
+        {
+            "pid": "...",
+            "id": "<uuid>",
+            "kind": "record" | "draft",
+            "subjects": [...],
+            "trace": {"field": "...", "value": ...}  # optional
+        }
+    ```
+
+    It is the input of a rollback.
+    """
+
+    def __init__(self, filepath=None, overwrite=False):
+        """Constructor.
+
+        :param overwrite: replace an existing journal at `filepath`. By
+                          default, an existing journal (the only pre-images
+                          of a previous update) raises FileExistsError.
+        :type overwrite: bool
+        """
+        if not filepath:
+            # In memory
+            self.f = StringIO()
+        else:
+            self.f = open(filepath, "w" if overwrite else "x")
+
+    def log(self, pid, id_, kind, subjects, trace=None):
+        """Append pre-image entry."""
+        entry = {"pid": pid, "id": id_, "kind": kind, "subjects": subjects}
+        if trace:
+            entry["trace"] = trace
+        self.f.write(json.dumps(entry, separators=(",", ":")))
+        self.f.write("\n")
+
+    def flush(self):
+        """Flush out to file."""
+        self.f.flush()
+
+    def close(self):
+        """Close file."""
+        self.f.close()
+
+    def read(self):
+        """Read file."""
+        offset = self.f.tell()
+        self.f.seek(0)
+        result = [json.loads(line) for line in self.f]
+        self.f.seek(offset)
+        return result
+
+
+class FailureLog:
+    """Log of records that failed to be committed or indexed.
+
+    It is the input of a replay.
+    """
+
+    def __init__(self, filepath=None):
+        """Constructor."""
+        if not filepath:
+            # In memory
+            self.f = StringIO()
+        else:
+            self.f = open(filepath, "w+", newline='')
+
+        self.header = ["pid", "id", "kind", "stage", "time", "error"]
+        self.writer = csv.DictWriter(
+            self.f, fieldnames=self.header
+        )
+        self.writer.writeheader()
+
+    def log(self, pid, id_, kind, stage, error):
+        """Log failed record."""
+        self.writer.writerow(
+            {
+                "pid": pid,
+                "id": id_,
+                "kind": kind,
+                "stage": stage,
+                "time": datetime.now(),
+                "error": error,
+            }
+        )
+        self.f.flush()
+
+    def close(self):
+        """Close file."""
+        self.f.close()
+
+    def read(self):
+        """Read file."""
+        offset = self.f.tell()
+        self.f.seek(0)
+        result = [e for e in csv.DictReader(self.f)]
+        self.f.seek(offset)
+        return result
@@ -9,8 +9,11 @@
 from datetime import datetime
 from pathlib import Path
 
+import pytest
+
+from galter_subjects_utils.contrib.lcsh import converter as lcsh_converter
 from galter_subjects_utils.contrib.lcsh.converter import LCSHRDMConverter, \
-    raw_to_deprecated
+    convert_lines, extract_main_concept, raw_to_deprecated
 from galter_subjects_utils.reader import read_jsonl
 
 
@@ -45,6 +48,36 @@ def test_converter():
     assert expected == dicts_of_lcsh_terms
 
 
+@pytest.mark.parametrize("selective", [True, False])
+def test_convert_lines(selective, monkeypatch):
+    monkeypatch.setattr(
+        lcsh_converter, "prefer_selective_extraction", selective
+    )
+    filepath = Path(__file__).parent / "data" / "fake_lcsh.skosrdf.jsonld"
+    lines = filepath.read_bytes().splitlines(keepends=True)
+    topics = list(read_jsonl(filepath))
+
+    assert list(LCSHRDMConverter(topics).convert()) == list(
+        convert_lines(lines)
+    )
+
+
+def test_extract_main_concept():
+    filepath = Path(__file__).parent / "data" / "fake_lcsh.skosrdf.jsonld"
+    lines = filepath.read_bytes().splitlines(keepends=True)
+    topics = list(read_jsonl(filepath))
+
+    # Main node only
+    concept = extract_main_concept(lines[0])
+    assert "http://id.loc.gov/authorities/subjects/sh00000011" == concept["@id"]  # noqa
+    assert concept in topics[0]["@graph"]
+    # Main node isn't a concept (deprecated)
+    assert {} == extract_main_concept(lines[2])
+    # Can't tell
+    line = b'{"@graph": [{"@type": "skos:Concept", "@id": "http://x/s/sh1"}], "@id": "/s/sh1"}\n'  # noqa
+    assert extract_main_concept(line) is None
+
+
 def test_deprecated():
     filepath = Path(__file__).parent / "data" / "fake_lcsh.skosrdf.jsonld"
     topics = list(read_jsonl(filepath))
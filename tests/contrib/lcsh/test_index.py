@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Northwestern University.
+#
+# galter-subjects-utils is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file for more
+# details.
+
+import os
+import shutil
+from pathlib import Path
+
+from galter_subjects_utils.contrib.lcsh.index import build_index, \
+    index_filepath, load_index, read_topics, topic_id
+from galter_subjects_utils.reader import read_jsonl
+
+
+def test_topic_id():
+    line = b'{"@graph": [{"@id": "http://x/sh1"}], "@id": "/a/s/sh2"}\n'
+    assert "sh2" == topic_id(line)
+    line = b'{"@graph": [{"@id": "http://x/sh1"}], "@id" : "/a/s/sh4"}\n'
+    assert "sh4" == topic_id(line)
+    # Falls back to parsing
+    line = b'{"@id": "/a/s/sh3", "@graph": [{"@id": "http://x/sh1"}]}\n'
+    assert "sh3" == topic_id(line)
+
+
+def test_index(tmp_path):
+    filepath = tmp_path / "lcsh.skosrdf.jsonld"
+    shutil.copy(
+        Path(__file__).parent / "data" / "fake_lcsh.skosrdf.jsonld", filepath
+    )
+    topics = list(read_jsonl(filepath))
+
+    index = build_index(filepath)
+
+    assert 7 == len(index)
+    assert index_filepath(filepath).exists()
+    assert index == load_index(filepath)
+    assert [topics[1], topics[4]] == list(
+        read_topics(filepath, ["sh2008007279", "unknown", "sh00000014"])
+    )
+
+    # Outdated index is rebuilt
+    lines = filepath.read_bytes().splitlines(keepends=True)
+    filepath.write_bytes(b"".join(lines[:2]))
+    os.utime(index_filepath(filepath), (0, 0))
+    assert {"sh00000011", "sh00000014"} == load_index(filepath).keys()
@@ -8,7 +8,8 @@
 
 """Test MeSH-related conversion functionality."""
 
-from galter_subjects_utils.contrib.mesh.converter import MeSHRDMConverter
+from galter_subjects_utils.contrib.mesh.converter import MeSHRDMConverter, \
+    compact_descriptor_ops
 
 
 def test_converter():
@@ -52,3 +53,40 @@ def test_converter():
         },
     ]
     assert expected == objects
+
+
+def test_compact_descriptor_ops():
+    prefix = "https://id.nlm.nih.gov/mesh/"
+    ops = [
+        {"type": "add", "id": prefix + "D3", "subject": "C"},
+        {"type": "replace", "id": prefix + "D1", "new_id": prefix + "D3"},
+        {
+            "type": "replace",
+            "id": prefix + "D1Q000145",
+            "new_id": prefix + "D3Q000145",
+        },
+        {
+            # replaced differently than descriptor
+            "type": "remove",
+            "id": prefix + "D1Q000191",
+        },
+        {"type": "remove", "id": prefix + "D2"},
+        {"type": "remove", "id": prefix + "D2Q000145"},
+        {"type": "remove", "id": prefix + "D2Q000191"},
+        {"type": "remove", "id": prefix + "D4Q000145"},
+    ]
+
+    compacted = list(compact_descriptor_ops(ops))
+
+    assert [
+        {"type": "add", "id": prefix + "D3", "subject": "C"},
+        {
+            "type": "replace",
+            "id": prefix + "D1",
+            "new_id": prefix + "D3",
+            "expand": "Q",
+        },
+        {"type": "remove", "id": prefix + "D1Q000191"},
+        {"type": "remove", "id": prefix + "D2", "expand": "Q"},
+        {"type": "remove", "id": prefix + "D4Q000145"},
+    ] == compacted
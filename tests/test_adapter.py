@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Northwestern University.
+#
+# galter-subjects-utils is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file for more
+# details.
+
+"""Test adapter."""
+
+from galter_subjects_utils.adapter import partitioned_subjects, \
+    rows_to_subjects
+from galter_subjects_utils.types_internal import RDMSubjectRow, Subject
+
+
+def test_partitioned_subjects():
+    rows = [
+        RDMSubjectRow("https://id.nlm.nih.gov/mesh/D1", "MeSH", "A"),
+        RDMSubjectRow("https://id.loc.gov/authorities/subjects/sh1", "LCSH", "B"),  # noqa
+        RDMSubjectRow("https://id.nlm.nih.gov/mesh/D2", "MeSH", "C"),
+        RDMSubjectRow("fos1", "FOS", "D"),
+        RDMSubjectRow("local1", "Local", "E"),
+    ]
+    prefixes = {
+        "MeSH": "https://id.nlm.nih.gov/mesh/",
+        "LCSH": "https://id.loc.gov/authorities/subjects/",
+        "Local": "",
+    }
+
+    result = partitioned_subjects(rows, prefixes)
+
+    assert {
+        "MeSH": [Subject(id="D1", label="A"), Subject(id="D2", label="C")],
+        "LCSH": [Subject(id="sh1", label="B")],
+        "Local": [Subject(id="local1", label="E")],
+    } == result
+
+
+def test_rows_to_subjects():
+    rows = [
+        RDMSubjectRow("https://id.nlm.nih.gov/mesh/D1", "MeSH", "A"),
+        RDMSubjectRow("D2", "MeSH", "B"),
+    ]
+
+    subjects = list(rows_to_subjects(rows, "https://id.nlm.nih.gov/mesh/"))
+
+    assert [
+        Subject(id="D1", label="A"),
+        Subject(id="D2", label="B"),
+    ] == subjects
@@ -6,7 +6,10 @@
 # modify it under the terms of the MIT License; see LICENSE file for more
 # details.
 
-from galter_subjects_utils.deltor import DeltasGenerator
+from operator import itemgetter
+
+from galter_subjects_utils.deltor import AnalysisStore, DeltasGenerator, \
+    ExternalDeltasGenerator
 from galter_subjects_utils.scheme import Scheme
 from galter_subjects_utils.types_internal import Subject
 
@@ -263,3 +266,121 @@ def test_deltor_replace():
         },
     ]
     assert expected == ops
+
+
+def test_deltor_iter_generate():
+    src = [subject_A(), subject_B()]
+    dst = [Subject(id="subject_a", label="Subject A2"), subject_B()]
+    dst += [Subject(id="subject_c", label="Subject C")]
+    deltor = DeltasGenerator(src, dst, scheme_for_tests)
+
+    ops = deltor.iter_generate(yes_logic=lambda op: op["type"] == "rename")
+
+    assert not isinstance(ops, list)
+    assert [
+        {
+            "type": "add",
+            "scheme": "SCHEME",
+            "id": "https://id.example.org/scheme/subject_c",
+            "subject": "Subject C",
+            "keep_trace": "N"
+        },
+        {
+            "type": "rename",
+            "scheme": "SCHEME",
+            "id": "https://id.example.org/scheme/subject_a",
+            "subject": "Subject A",
+            "new_subject": "Subject A2",
+            "keep_trace": "Y"
+        },
+    ] == list(ops)
+
+
+def mixed_scenario():
+    """Return src, dst and replacements exercising all op types."""
+    subject_original, subject_renamed = subjects_renamed()
+    replaced_by_present, replacer_present = subjects_replaced_by_already_present()  # noqa
+    replaced_by_added, replacer_added = subjects_replaced_by_added()
+    replaced_by_renamed, replacer_renamed = subjects_replaced_by_renamed()
+    src = [
+        subject_A(),
+        subject_B(),
+        subject_original,
+        replaced_by_present,
+        replacer_present,
+        replaced_by_added,
+        replaced_by_renamed,
+    ]
+    dst = [
+        Subject(id="subject_c", label="Subject C"),
+        subject_B(),
+        subject_renamed,
+        replacer_present,
+        replacer_added,
+        replacer_renamed,
+    ]
+    replacements = {
+        replaced_by_present.label: replacer_present.label,
+        replaced_by_added.label: replacer_added.label,
+        replaced_by_renamed.label: replacer_renamed.label,
+    }
+    return src, dst, replacements
+
+
+def test_external_deltor():
+    src, dst, replacements = mixed_scenario()
+
+    ops = ExternalDeltasGenerator(
+        src, dst, scheme_for_tests, replacements, run_size=2
+    ).generate()
+
+    expected = DeltasGenerator(
+        src, dst, scheme_for_tests, replacements
+    ).generate()
+    assert 7 == len(expected)
+    key = itemgetter("type", "id")
+    assert sorted(expected, key=key) == sorted(ops, key=key)
+
+
+def test_external_deltor_replacement_ties():
+    # Several added or relabelled subjects have the replacement label
+    src = [
+        Subject(id="a", label="Old"),
+        Subject(id="y", label="Y"),
+        Subject(id="c", label="C"),
+        Subject(id="d", label="Older"),
+    ]
+    dst = [
+        Subject(id="z", label="New"),
+        Subject(id="b", label="New"),
+        Subject(id="y", label="Newer"),
+        Subject(id="c", label="Newer"),
+    ]
+    replacements = {"Old": "New", "Older": "Newer"}
+
+    ops = ExternalDeltasGenerator(
+        src, dst, scheme_for_tests, replacements, run_size=2
+    ).generate()
+
+    expected = DeltasGenerator(
+        src, dst, scheme_for_tests, replacements
+    ).generate()
+    replaces = [op for op in expected if op["type"] == "replace"]
+    assert [
+        "https://id.example.org/scheme/z",
+        "https://id.example.org/scheme/y",
+    ] == [op["new_id"] for op in replaces]
+    key = itemgetter("type", "id")
+    assert sorted(expected, key=key) == sorted(ops, key=key)
+
+
+def test_analysis_store():
+    analyses = AnalysisStore()
+
+    analyses.append("a", "A")
+    analyses.append("b", "B")
+    analyses.append("a", "A again")  # repeated id is ignored
+
+    assert 2 == len(analyses)
+    assert ["a", "b"] == analyses.ids()
+    assert {"A": 0, "B": 1} == analyses.label_to_index
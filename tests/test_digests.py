@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Northwestern University.
+#
+# galter-subjects-utils is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file for more
+# details.
+
+"""Test incremental deltas functionality."""
+
+from galter_subjects_utils.deltor import DeltasGenerator
+from galter_subjects_utils.digests import changed_subjects, read_digests, \
+    with_digests, write_digests
+from galter_subjects_utils.scheme import Scheme
+from galter_subjects_utils.types_internal import Subject
+
+
+def test_write_read_digests(tmp_path):
+    filepath = tmp_path / "digests.csv"
+    digests = {}
+    subjects = [Subject("sh1", "Cats"), Subject("sh2", "Dogs")]
+
+    assert subjects == list(with_digests(subjects, digests))
+    write_digests(digests, filepath)
+
+    assert digests == read_digests(filepath)
+    assert digests["sh1"] != digests["sh2"]
+
+
+def test_changed_subjects_same_ops_as_full():
+    # Instance is in sync with previous run's dst subjects
+    src = [
+        Subject("sh1", "Cats"),
+        Subject("sh2", "Dogs"),
+        Subject("sh3", "Birds"),
+        Subject("sh4", "Fish"),
+        Subject("sh5", "Horses"),
+        Subject("sh6", "Horses/history"),
+        Subject("sh7", "Ponies"),
+    ]
+    previous = {}
+    list(with_digests(src, previous))
+    dst = [
+        Subject("sh1", "Cats"),
+        Subject("sh2", "Dogs (Animals)"),  # renamed
+        # sh3 removed
+        # sh4 replaced by unchanged subject
+        Subject("sh5", "Horses"),
+        Subject("sh6", "Horses/history"),
+        # sh7 replaced by added subject
+        Subject("sh8", "Small horses"),
+    ]
+    replacements = {"Fish": "Horses", "Ponies": "Small horses"}
+    scheme = Scheme("S", "s:")
+
+    src_changed, dst_changed, digests = changed_subjects(
+        src, dst, previous, replacements
+    )
+    ops = DeltasGenerator(
+        src_changed, dst_changed, scheme, replacements
+    ).generate()
+
+    expected = DeltasGenerator(src, dst, scheme, replacements).generate()
+    assert 5 == len(expected)
+    assert expected == ops
+    # sh1 is left out
+    assert ["sh2", "sh5", "sh6", "sh8"] == [s.id for s in dst_changed]
+    assert 5 == len(digests)
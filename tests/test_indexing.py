@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Northwestern University.
+#
+# galter-subjects-utils is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file for more
+# details.
+
+"""Test bulk indexing stage."""
+
+from types import SimpleNamespace
+
+from galter_subjects_utils.indexing import AdaptiveBulkIndexer, AdaptiveLimits
+from galter_subjects_utils.writer import FailureLog
+
+
+class FakeClient:
+    """Search client answering with scripted item statuses."""
+
+    def __init__(self, statuses_by_id):
+        """Constructor."""
+        self.statuses_by_id = statuses_by_id
+        self.requests = []
+
+    def bulk(self, body):
+        """Answer with next scripted status of each item."""
+        ids = [meta["index"]["_id"] for meta in body[::2]]
+        self.requests.append(ids)
+        return {
+            "errors": True,
+            "items": [
+                {
+                    "index": {
+                        "_id": id_,
+                        "status": self.statuses_by_id[id_].pop(0),
+                        "error": {"type": "mapper_parsing_exception"},
+                    }
+                }
+                for id_ in ids
+            ]
+        }
+
+
+class FakeIndexer:
+    """Minimal indexer interface."""
+
+    _version_type = "external_gte"
+
+    def __init__(self, client):
+        """Constructor."""
+        self.client = client
+
+    def record_to_index(self, record):
+        """Index of record."""
+        return "records"
+
+    def _prepare_index(self, index):
+        """Prefix index."""
+        return index
+
+    def _prepare_record(self, record, index):
+        """Dump record."""
+        return dict(record.data)
+
+
+def fake_record(i):
+    """Record-like object."""
+    return SimpleNamespace(
+        id=f"id-{i}",
+        revision_id=1,
+        pid=SimpleNamespace(pid_value=f"pid-{i}"),
+        data={"metadata": {"title": f"{i}"}},
+    )
+
+
+def test_adaptive_bulk_indexer():
+    client = FakeClient(
+        {
+            "id-0": [201],
+            "id-1": [429, 201],  # rejected then ok
+            "id-2": [400],  # permanent failure
+            "id-3": [429, 429, 429],  # gives up
+        }
+    )
+    failures = FailureLog()
+    limits = AdaptiveLimits(batch_size=4, min_batch_size=1)
+    indexing = AdaptiveBulkIndexer(
+        FakeIndexer(client),
+        failures=failures,
+        limits=limits,
+        max_retries=2,
+        sleep=lambda s: None,
+    )
+
+    for i in range(4):
+        indexing.add(fake_record(i))
+    indexing.close()
+
+    assert [
+        ["id-0", "id-1", "id-2", "id-3"],
+        ["id-1", "id-3"],
+        ["id-3"],
+    ] == client.requests
+    assert [("pid-2", "index"), ("pid-3", "index")] == [
+        (e["pid"], e["stage"]) for e in failures.read()
+    ]
+    # Backed off because of rejections
+    assert limits.batch_size < 4
+    assert 1 == limits.concurrency
+    counters = indexing.metrics.counters
+    assert 2 == counters["indexed"]
+    assert 2 == counters["index_failures"]
+    assert 2 == counters["index_retries"]
+    assert 3 == indexing.metrics.histograms["index"].count
+
+
+def test_adaptive_limits():
+    limits = AdaptiveLimits(
+        batch_size=100,
+        min_batch_size=10,
+        max_batch_size=120,
+        concurrency=1,
+        max_concurrency=2,
+        target_latency=2.0,
+    )
+
+    limits.on_success(0.1)
+    assert (110, 2) == (limits.batch_size, limits.concurrency)
+    limits.on_success(0.1)
+    limits.on_success(0.1)
+    assert (120, 2) == (limits.batch_size, limits.concurrency)
+    limits.on_success(3.0)  # slow
+    assert (90, 2) == (limits.batch_size, limits.concurrency)
+    limits.on_pressure()
+    assert (45, 1) == (limits.batch_size, limits.concurrency)
@@ -9,6 +9,7 @@
 """Test KeepTrace."""
 
 from galter_subjects_utils.keeptrace import KeepTrace
+from galter_subjects_utils.reader import read_csv_rows
 
 
 def test_mark():
@@ -68,3 +69,56 @@ def test_should_trace():
 
     op_no = {**op_no_key, KeepTrace.keep_trace_key: "n"}
     assert keep_trace.should_trace(op_no) is False
+
+
+def test_should_trace_short_row(tmp_path):
+    filepath = tmp_path / "deltas.csv"
+    filepath.write_text(
+        "id,type,scheme,subject,new_id,new_subject,keep_trace\n"
+        "D1,rename,MeSH,Foo,,Bar\n"
+    )
+    keep_trace = KeepTrace(field="any", template="any")
+
+    row = next(read_csv_rows(filepath, ["id", "type", "keep_trace"]))
+
+    assert row.get(KeepTrace.keep_trace_key) is None
+    assert keep_trace.should_trace(row) is False
+
+
+def test_preimage_restore():
+    record = {
+        "metadata": {
+            "subjects": [{"id": "http://example.org/baz/0"}],
+        },
+        "custom_fields": {"former": "before"},
+    }
+
+    # Trace into a list: whole list is the pre-image
+    keep_trace = KeepTrace(field="metadata.subjects.subject", template="{subject}")  # noqa
+    preimage = keep_trace.preimage(record)
+    assert {
+        "field": "metadata.subjects",
+        "value": [{"id": "http://example.org/baz/0"}],
+    } == preimage
+    keep_trace.trace(record, "0")
+    KeepTrace.restore(record, preimage)
+    assert [{"id": "http://example.org/baz/0"}] == record["metadata"]["subjects"]  # noqa
+
+    # Trace into existing field
+    keep_trace = KeepTrace(field="custom_fields.former", template="{subject}")
+    preimage = keep_trace.preimage(record)
+    assert {"field": "custom_fields.former", "value": "before"} == preimage
+    keep_trace.trace(record, "0")
+    KeepTrace.restore(record, preimage)
+    assert "before" == record["custom_fields"]["former"]
+
+    # Trace into missing field
+    keep_trace = KeepTrace(field="missing.former", template="{subject}")
+    preimage = keep_trace.preimage(record)
+    assert {"field": "missing"} == preimage
+    keep_trace.trace(record, "0")
+    KeepTrace.restore(record, preimage)
+    assert "missing" not in record
+
+    # No tracing
+    assert KeepTrace(None, None).preimage(record) is None
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Northwestern University.
+#
+# galter-subjects-utils is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file for more
+# details.
+
+"""Test instrumentation."""
+
+import json
+
+import pytest
+
+from galter_subjects_utils.metrics import LatencyHistogram, UpdateMetrics
+
+
+class FakeClock:
+    """Clock advancing by 1 second per call."""
+
+    def __init__(self):
+        """Constructor."""
+        self.now = 0.0
+
+    def __call__(self):
+        """Tick."""
+        self.now += 1.0
+        return self.now
+
+
+def test_histogram():
+    histogram = LatencyHistogram()
+
+    for seconds in [0.002, 0.002, 0.003, 0.2, 20]:
+        histogram.observe(seconds)
+
+    assert 5 == histogram.count
+    assert 20 == histogram.max
+    assert 0.005 == histogram.quantile(0.5)
+    assert 20 == histogram.quantile(0.99)
+    assert 1 == histogram.to_dict()["buckets"]["inf"]
+
+
+def test_metrics(tmp_path):
+    metrics = UpdateMetrics(clock=FakeClock())
+
+    with metrics.phase("update_records"):
+        metrics.count("scanned", 10)
+        metrics.count("matched")
+        with metrics.timer("commit"):
+            pass
+        with pytest.raises(ValueError):
+            with metrics.timer("index"):
+                raise ValueError()
+
+    result = metrics.to_dict()
+    assert {"update_records": 5.0} == result["phases"]
+    assert 5.0 == result["elapsed"]
+    assert {"scanned": 10, "matched": 1, "index_errors": 1} == result["counters"]  # noqa
+    assert 2.0 == result["throughput"]["scanned"]
+    assert 1 == result["latencies"]["commit"]["count"]
+    assert 1 == result["latencies"]["index"]["count"]
+    assert "scanned" in metrics.summary()
+
+    filepath = metrics.write_json(tmp_path / "metrics.json")
+    assert result == json.loads(filepath.read_text())
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Northwestern University.
+#
+# galter-subjects-utils is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file for more
+# details.
+
+"""Test progress reporting."""
+
+from io import StringIO
+
+from galter_subjects_utils.progress import ProgressReporter
+
+
+class FakeClock:
+    """Settable clock."""
+
+    def __init__(self):
+        """Constructor."""
+        self.now = 0.0
+
+    def __call__(self):
+        """Return current time."""
+        return self.now
+
+
+def test_progress_with_total():
+    stream = StringIO()
+    clock = FakeClock()
+    progress = ProgressReporter(
+        stream=stream, interval=10, check_every=100, clock=clock
+    )
+    progress.start("records", total=1000)
+
+    # Before interval: no report
+    clock.now = 5
+    progress.advance(100)
+    assert "" == stream.getvalue()
+
+    # After interval: report
+    clock.now = 20
+    progress.advance(100)
+    assert "[records] 200/~1,000 (20.0%) 10.0/s ETA 0:01:20\n" == stream.getvalue()  # noqa
+
+    progress.finish()
+    assert "[records] 200 done in 0:00:20 (10.0/s)\n" == stream.getvalue().splitlines(keepends=True)[-1]  # noqa
+
+
+def test_progress_without_total():
+    stream = StringIO()
+    clock = FakeClock()
+    progress = ProgressReporter(
+        stream=stream, interval=10, check_every=1, clock=clock
+    )
+    progress.start("drafts")
+
+    clock.now = 10
+    progress.advance(50)
+
+    assert "[drafts] 50 (5.0/s)\n" == stream.getvalue()
+
+
+def test_progress_silent():
+    progress = ProgressReporter()
+    progress.start("records", total=10)
+
+    progress.advance(500)
+    progress.finish()
+
+    assert 500 == progress.count
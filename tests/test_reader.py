@@ -9,7 +9,81 @@
 """Test general reader functionality."""
 
 
-from galter_subjects_utils.reader import get_rdm_subjects, mapping_by
+from galter_subjects_utils.reader import compact_mapping_by, \
+    get_rdm_subjects, jsonl_chunks, mapping_by, read_csv, read_csv_rows, \
+    read_failed_records, read_jsonl, read_jsonl_parallel, read_lines
+from galter_subjects_utils.writer import FailureLog, SubjectDeltaLogger
+
+
+def test_read_csv_rows(tmp_path):
+    filepath = tmp_path / "deltas.csv"
+    filepath.write_text(
+        "id,type,scheme,subject,new_id,new_subject,keep_trace\n"
+        "D1,rename,MeSH,Foo,,Bar,Y\n"
+        "D2,remove,MeSH,Baz,,,N\n"
+    )
+
+    rows = list(
+        read_csv_rows(filepath, ["id", "type", "new_subject", "expand"])
+    )
+
+    assert 2 == len(rows)
+    assert all(isinstance(row, tuple) for row in rows)
+    dicts = list(read_csv(filepath))
+    for row, d in zip(rows, dicts):
+        assert d["id"] == row["id"]
+        assert d["type"] == row["type"]
+        assert d["new_subject"] == row["new_subject"]
+        # absent from file or not selected
+        assert row.get("expand") is None
+        assert "x" == row.get("scheme", "x")
+    assert ("D1", "rename", "Bar") == rows[0]
+
+
+def test_read_lines(tmp_path):
+    filepath = tmp_path / "lines.txt"
+    filepath.write_bytes(b"a\nbb\n\nccc")
+
+    assert [b"a\n", b"bb\n", b"\n", b"ccc"] == list(read_lines(filepath))
+    assert [(0, b"a\n"), (2, b"bb\n"), (5, b"\n"), (6, b"ccc")] == list(
+        read_lines(filepath, offsets=True)
+    )
+    assert [b"bb\n", b"\n"] == list(read_lines(filepath, start=2, end=6))
+
+    filepath.write_bytes(b"")
+    assert [] == list(read_lines(filepath))
+
+
+def evens(entries):
+    return (e for e in entries if e["n"] % 2 == 0)
+
+
+def test_read_jsonl_parallel(tmp_path):
+    filepath = tmp_path / "entries.jsonl"
+    with open(filepath, "w") as f:
+        for n in range(100):
+            f.write(f'{{"n": {n}, "pad": "{"x" * (n % 7)}"}}\n')
+
+    # Chunks are newline-aligned and cover the whole file
+    chunks = jsonl_chunks(filepath, chunk_size=50)
+    assert 1 < len(chunks)
+    assert 0 == chunks[0][0]
+    assert filepath.stat().st_size == chunks[-1][1]
+    with open(filepath, "rb") as f:
+        data = f.read()
+    assert all(data[end - 1:end] == b"\n" for _, end in chunks)
+
+    expected = list(read_jsonl(filepath))
+    kwargs = {"workers": 2, "chunk_size": 50}
+    assert expected == list(read_jsonl_parallel(filepath, **kwargs))
+    assert expected == sorted(
+        read_jsonl_parallel(filepath, ordered=False, **kwargs),
+        key=lambda e: e["n"]
+    )
+    assert [e for e in expected if e["n"] % 2 == 0] == list(
+        read_jsonl_parallel(filepath, evens, **kwargs)
+    )
+    assert expected == list(read_jsonl_parallel(filepath, workers=1))
 
 
 def test_mapping_by():
@@ -71,6 +145,15 @@ def test_mapping_by():
     }
     assert expected == mapping
 
+    compact_mapping = compact_mapping_by(iterable, by="UI", keys=["UI", "MH"])
+
+    assert expected.keys() == compact_mapping.keys()
+    for key, value in compact_mapping.items():
+        assert expected[key]["UI"] == value["UI"]
+        assert expected[key]["MH"] == value["MH"]
+        assert value.get("AQ") is None
+    assert ("D044446", "Volvox") == compact_mapping["D044446"]
+
 
 def test_get_rdm_subjects(running_app, create_subject_data):
     subjects = [
@@ -106,4 +189,40 @@ def test_get_rdm_subjects(running_app, create_subject_data):
 
     subjects = [s for s in get_rdm_subjects(scheme="foo")]
     assert 3 == len(subjects)
-    assert {"0", "1", "2"} == {e["subject"] for e in subjects}
+    assert {"0", "1", "2"} == {row.subject for row in subjects}
+
+    # Streamed in small batches
+    subjects = [s for s in get_rdm_subjects(scheme="foo", batch_size=2)]
+    assert 3 == len(subjects)
+    assert {"0", "1", "2"} == {row.subject for row in subjects}
+    assert {"foo", "bar"} <= {row.scheme for row in get_rdm_subjects()}
+
+
+def test_read_failed_records(tmp_path):
+    # From SubjectDeltaLogger file
+    filepath = tmp_path / "updated_records.csv"
+    logger = SubjectDeltaLogger(filepath)
+    logger.log("abcde-00000", {"type": "remove", "id": "A"})
+    logger.flush()
+    logger.log("abcde-12345", {"type": "remove", "id": "A"}, error="boom")
+    logger.flush()
+    logger.close()
+
+    entries = list(read_failed_records(filepath))
+
+    assert [{"pid": "abcde-12345", "id": "", "kind": ""}] == entries
+
+    # From FailureLog file
+    filepath = tmp_path / "failed_records.csv"
+    failures = FailureLog(filepath)
+    failures.log("abcde-12345", "uuid-0", "record", "index", "boom")
+    failures.log("abcde-12345", "uuid-0", "record", "index", "boom again")
+    failures.log("abcde-12345", "uuid-0", "draft", "commit", "boom")
+    failures.close()
+
+    entries = list(read_failed_records(filepath))
+
+    assert [
+        {"pid": "abcde-12345", "id": "uuid-0", "kind": "record"},
+        {"pid": "abcde-12345", "id": "uuid-0", "kind": "draft"},
+    ] == entries
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright (C) 2026 Northwestern University.
+#
+# galter-subjects-utils is free software; you can redistribute it and/or
+# modify it under the terms of the MIT License; see LICENSE file for more
+# details.
+
+"""Test cached snapshots."""
+
+from galter_subjects_utils.snapshots import cache_filepaths, \
+    cached_rdm_subjects
+
+
+def test_cached_rdm_subjects(running_app, create_subject_data, tmp_path):
+    create_subject_data(
+        input_={
+            "id": "http://example.org/foo/0",
+            "scheme": "foo",
+            "subject": "0",
+        }
+    )
+    create_subject_data(
+        input_={
+            "id": "http://example.org/bar/0",
+            "scheme": "bar",
+            "subject": "0",
+        }
+    )
+    fp_of_snapshot, fp_of_stamp = cache_filepaths(tmp_path, "foo")
+
+    rows = list(cached_rdm_subjects(tmp_path, scheme="foo"))
+
+    assert [("http://example.org/foo/0", "foo", "0")] == rows
+    assert fp_of_stamp.exists()
+
+    # Reused while unchanged
+    mtime = fp_of_snapshot.stat().st_mtime_ns
+    assert rows == list(cached_rdm_subjects(tmp_path, scheme="foo"))
+    assert mtime == fp_of_snapshot.stat().st_mtime_ns
+
+    # Refreshed once changed
+    create_subject_data(
+        input_={
+            "id": "http://example.org/foo/1",
+            "scheme": "foo",
+            "subject": "1",
+        }
+    )
+    rows = list(cached_rdm_subjects(tmp_path, scheme="foo"))
+    assert {"0", "1"} == {row.subject for row in rows}
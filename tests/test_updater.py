@@ -17,9 +17,12 @@ from invenio_rdm_records.records import RDMDraft, RDMRecord
 from invenio_records_resources.proxies import current_service_registry
 from invenio_vocabularies.contrib.subjects.api import Subject
 
+from galter_subjects_utils.indexing import AdaptiveBulkIndexer
 from galter_subjects_utils.keeptrace import KeepTrace
-from galter_subjects_utils.updater import SubjectDeltaUpdater
-from galter_subjects_utils.writer import SubjectDeltaLogger
+from galter_subjects_utils.updater import FailedRecordsReplay, \
+    SubjectDeltaUpdater, SubjectJournalRollback, order_ops
+from galter_subjects_utils.writer import FailureLog, PreImageJournal, \
+    SubjectDeltaLogger
 
 
 # Fixtures
@@ -558,3 +561,337 @@ def test_update_edge_case(
     assert 2 == len(subjects)
     assert any_contains(subjects, {"subject": "0QA"})
     assert any_contains(subjects, {"id": "http://example.org/zim/0"})
+
+
+def test_update_descriptor_ops(
+    create_subject_data, minimal_record_input, create_record_data_fn,
+    subjects_service,
+):
+    # Assignments
+    for id_ in ["0", "0QA", "0QB", "1", "1QA", "2", "2QA"]:
+        create_subject_data(
+            system_identity,
+            {
+                "id": f"http://example.org/zap/{id_}",
+                "scheme": "zap",
+                "subject": id_,
+            },
+        )
+    record_input = copy.deepcopy(minimal_record_input)
+    record_input["metadata"]["subjects"] = [
+        {"id": "http://example.org/zap/0QA"},
+        {"id": "http://example.org/zap/0QB"},
+        {"id": "http://example.org/zap/2"},
+    ]
+    record_0_data = create_record_data_fn(system_identity, record_input)
+    record_input = copy.deepcopy(minimal_record_input)
+    record_input["metadata"]["subjects"] = [
+        {"id": "http://example.org/zap/1"},
+        {"id": "http://example.org/zap/1QA"},
+    ]
+    record_1_data = create_record_data_fn(system_identity, record_input)
+
+    delta_ops = [
+        # descriptor-level ops
+        {
+            "type": "remove",
+            "id": "http://example.org/zap/0",
+            "scheme": "zap",
+            "subject": "0",
+            "expand": "Q",
+        },
+        {
+            "type": "replace",
+            "id": "http://example.org/zap/1",
+            "scheme": "zap",
+            "subject": "1",
+            "new_id": "http://example.org/zap/2",
+            "expand": "Q",
+        },
+        # explicit op takes precedence
+        {
+            "type": "replace",
+            "id": "http://example.org/zap/0QB",
+            "scheme": "zap",
+            "subject": "0QB",
+            "new_id": "http://example.org/zap/2QA",
+        },
+    ]
+    delta_logger = SubjectDeltaLogger()
+    RDMRecord.index.refresh()
+    Subject.index.refresh()
+
+    # Actions
+    updater = SubjectDeltaUpdater(
+        delta_ops, delta_logger, KeepTrace(None, None)
+    )
+    updater.update()
+    RDMRecord.index.refresh()
+    Subject.index.refresh()
+
+    # Assertions
+    subjects = get_subjects_of_record_from_db(record_0_data.pid.pid_value)
+    assert [
+        "http://example.org/zap/2QA",
+        "http://example.org/zap/2",
+    ] == [s["id"] for s in subjects]
+    subjects = get_subjects_of_record_from_db(record_1_data.pid.pid_value)
+    assert [
+        "http://example.org/zap/2",
+        "http://example.org/zap/2QA",
+    ] == [s["id"] for s in subjects]
+    # qualified subjects are removed too
+    for id_ in ["0", "0QA", "0QB", "1", "1QA"]:
+        with pytest.raises(PIDDoesNotExistError):
+            subjects_service.read(
+                system_identity, f"http://example.org/zap/{id_}"
+            )
+    assert subjects_service.read(
+        system_identity, "http://example.org/zap/2QA"
+    )
+
+
+def test_order_ops():
+    ops = [
+        {"type": "remove", "id": "0", "expand": "Q"},
+        {"type": "remove", "id": "1", "expand": ""},
+        {"type": "replace", "id": "2", "expand": "Q"},
+        {"type": "remove", "id": "3"},
+    ]
+
+    ordered_ops = order_ops(ops)
+
+    assert ["1", "3", "0", "2"] == [op["id"] for op in ordered_ops]
+
+
+def test_update_rollback(
+    create_subject_data, minimal_record_input, create_record_data_fn,
+    subjects_service,
+):
+    # Assignments
+    subjects_data = [
+        create_subject_data(
+            system_identity,
+            {
+                "id": f"http://example.org/qux/{i}",
+                "scheme": "qux",
+                "subject": f"{i}",
+            },
+        )
+        for i in range(2)
+    ]
+    record_input = copy.deepcopy(minimal_record_input)
+    record_input["metadata"]["subjects"] = [
+        {"id": "http://example.org/qux/0"},
+        {"id": "http://example.org/qux/1"},
+        {"subject": "a_keyword"},
+    ]
+    record_data = create_record_data_fn(system_identity, record_input)
+    delta_ops = [
+        {
+            "type": "remove",
+            "id": "http://example.org/qux/0",
+            "scheme": "qux",
+            "subject": "0",
+            "keep_trace": "Y",
+        },
+        {
+            "type": "rename",
+            "id": "http://example.org/qux/1",
+            "scheme": "qux",
+            "subject": "1",
+            "new_subject": "Qux-One",
+            "keep_trace": "Y",
+        }
+    ]
+    keep_trace = KeepTrace(
+        field="metadata.subjects.subject",
+        template="Former: {subject}"
+    )
+    journal = PreImageJournal()
+    RDMRecord.index.refresh()
+    Subject.index.refresh()
+    updater = SubjectDeltaUpdater(
+        delta_ops, SubjectDeltaLogger(), keep_trace, journal
+    )
+    updater.update()
+    pid = record_data.pid.pid_value
+    assert 4 == len(get_subjects_of_record_from_db(pid))
+
+    # Actions
+    entries = journal.read()
+    delta_logger = SubjectDeltaLogger()
+    rollback = SubjectJournalRollback(
+        entries, delta_logger, ops_data=delta_ops, batch_size=1
+    )
+    rollback.rollback()
+    RDMRecord.index.refresh()
+    Subject.index.refresh()
+
+    # Assertions
+    assert 1 == len(entries)
+    assert pid == entries[0]["pid"]
+
+    # at DB
+    subjects = get_subjects_of_record_from_db(pid)
+    assert 3 == len(subjects)
+    assert any_contains(subjects, {"id": "http://example.org/qux/0"})
+    assert any_contains(
+        subjects,
+        {"id": "http://example.org/qux/1", "subject": "1"},
+    )
+    assert not any_contains(subjects, {"subject": "Former: 0"})
+    assert subjects_service.read(system_identity, "http://example.org/qux/0")
+
+    # at document engine
+    records = get_records_from_de()
+    subjects = get_subjects_of_record_from_de(records, pid)
+    assert 3 == len(subjects)
+    assert any_contains(subjects, {"id": "http://example.org/qux/0"})
+    assert not any_contains(subjects, {"subject": "Former: 0"})
+
+    # logging
+    log_entry = next(e for e in delta_logger.read() if e["pid"] == pid)
+    assert "" == log_entry["error"]
+
+
+def test_rollback_refuses_expand_ops():
+    delta_ops = [
+        {
+            "type": "remove",
+            "id": "http://example.org/qux/0",
+            "scheme": "qux",
+            "subject": "0",
+            "expand": "Q",
+        },
+    ]
+
+    with pytest.raises(ValueError):
+        SubjectJournalRollback([], SubjectDeltaLogger(), ops_data=delta_ops)
+
+
+def test_rollback_restores_earliest_preimage(
+    minimal_record_input, create_record_data_fn,
+):
+    # Assignments
+    record_input = copy.deepcopy(minimal_record_input)
+    record_input["metadata"]["subjects"] = [{"subject": "current"}]
+    record_data = create_record_data_fn(system_identity, record_input)
+    pid = record_data.pid.pid_value
+    # As if 2 updates had been journaled together
+    entries = [
+        {
+            "pid": pid,
+            "id": str(record_data.id),
+            "kind": "record",
+            "subjects": [{"subject": subject}],
+        }
+        for subject in ["earliest", "latest"]
+    ]
+
+    # Actions
+    SubjectJournalRollback(
+        entries, SubjectDeltaLogger(), batch_size=1
+    ).rollback()
+
+    # Assertions
+    subjects = get_subjects_of_record_from_db(pid)
+    assert [{"subject": "earliest"}] == subjects
+
+
+def test_replay_recommit(
+    create_subject_data, minimal_record_input, create_record_data_fn,
+):
+    # Assignments
+    subjects_data = [
+        create_subject_data(
+            system_identity,
+            {
+                "id": f"http://example.org/quux/{i}",
+                "scheme": "quux",
+                "subject": f"{i}",
+            },
+        )
+        for i in range(2)
+    ]
+    record_input = copy.deepcopy(minimal_record_input)
+    record_input["metadata"]["subjects"] = [
+        {"id": "http://example.org/quux/0"},
+    ]
+    record_data = create_record_data_fn(system_identity, record_input)
+    pid = record_data.pid.pid_value
+    delta_ops = [
+        {
+            "type": "replace",
+            "id": "http://example.org/quux/0",
+            "scheme": "quux",
+            "subject": "0",
+            "new_id": "http://example.org/quux/1",
+        }
+    ]
+    # As if the update had failed to commit this record
+    entries = [{"pid": pid, "id": "", "kind": ""}]
+    failures = FailureLog()
+    indexing = AdaptiveBulkIndexer(
+        current_service_registry.get("records").indexer,
+        failures=failures,
+    )
+    delta_logger = SubjectDeltaLogger()
+
+    # Actions
+    replay = FailedRecordsReplay(
+        entries,
+        delta_logger,
+        indexing,
+        ops_data=delta_ops,
+        failures=failures,
+    )
+    replay.replay()
+    indexing.close()
+    RDMRecord.index.refresh()
+
+    # Assertions
+    subjects = get_subjects_of_record_from_db(pid)
+    assert [{"id": "http://example.org/quux/1"}] == [
+        {"id": s["id"]} for s in subjects
+    ]
+    records = get_records_from_de()
+    subjects = get_subjects_of_record_from_de(records, pid)
+    assert any_contains(subjects, {"id": "http://example.org/quux/1"})
+    assert [] == failures.read()
+    log_entry = next(e for e in delta_logger.read() if e["pid"] == pid)
+    assert "" == log_entry["error"]
+
+
+def test_replay_not_found(running_app, db):
+    # Assignments
+    entries = [
+        # pid without recid
+        {"pid": "nope-0", "id": "", "kind": ""},
+        # uuid without record
+        {
+            "pid": "nope-1",
+            "id": "00000000-0000-0000-0000-000000000001",
+            "kind": "record",
+        },
+    ]
+    failures = FailureLog()
+    indexing = AdaptiveBulkIndexer(
+        current_service_registry.get("records").indexer,
+        failures=failures,
+    )
+    delta_logger = SubjectDeltaLogger()
+
+    # Actions
+    FailedRecordsReplay(
+        entries, delta_logger, indexing, failures=failures
+    ).replay()
+    indexing.close()
+
+    # Assertions
+    log_entries = delta_logger.read()
+    assert ["nope-0", "nope-1"] == [e["pid"] for e in log_entries]
+    assert all("record not found" == e["error"] for e in log_entries)
+    failed = failures.read()
+    assert ["nope-0", "nope-1"] == [e["pid"] for e in failed]
+    assert all("load" == e["stage"] for e in failed)
@@ -10,8 +10,12 @@
 
 from pathlib import Path
 
-from galter_subjects_utils.reader import read_jsonl
-from galter_subjects_utils.writer import SubjectDeltaLogger, write_jsonl
+import pytest
+
+from galter_subjects_utils.reader import read_jsonl, read_snapshot
+from galter_subjects_utils.types_internal import RDMSubjectRow
+from galter_subjects_utils.writer import PreImageJournal, SubjectDeltaLogger, \
+    write_jsonl, write_snapshot
 
 
 def test_write():
@@ -48,6 +52,34 @@ def test_write():
     filepath.unlink(missing_ok=True)
 
 
+def test_write_snapshot(tmp_path):
+    filepath = tmp_path / "snapshot.csv"
+    subjects = [
+        {
+            "id": "https://id.nlm.nih.gov/mesh/D000015",
+            "pid": "D000015",
+            "scheme": "MeSH",
+            "subject": "Abnormalities, Multiple",
+        },
+        {
+            "id": "https://id.loc.gov/authorities/subjects/sh85021262",
+            "scheme": "LCSH",
+            "subject": "Cats",
+        },
+    ]
+
+    write_snapshot(subjects, filepath)
+
+    assert [
+        RDMSubjectRow(
+            id="https://id.nlm.nih.gov/mesh/D000015",
+            scheme="MeSH",
+            subject="Abnormalities, Multiple",
+        ),
+    ] == list(read_snapshot(filepath, scheme="MeSH"))
+    assert 2 == len(list(read_snapshot(filepath)))
+
+
 def test_logging_corner_cases():
     # Log exception messages
     logger = SubjectDeltaLogger()
@@ -89,3 +121,51 @@ def test_logging_corner_cases():
     deltas = "A -> X + B -> D"
     assert deltas == entries[0]["deltas"]
     assert "" == entries[0]["error"]
+
+
+def test_journal():
+    journal = PreImageJournal()
+
+    journal.log(
+        "abcde-12345",
+        id_="0c9d3a3e-9b8e-4b5e-8f0e-1c2d3e4f5a6b",
+        kind="record",
+        subjects=[{"id": "A"}, {"subject": "keyword"}],
+        trace={"field": "custom_fields.former"},
+    )
+    journal.log(
+        "abcde-54321",
+        id_="1c9d3a3e-9b8e-4b5e-8f0e-1c2d3e4f5a6b",
+        kind="draft",
+        subjects=[],
+    )
+
+    entries = journal.read()
+    assert [
+        {
+            "pid": "abcde-12345",
+            "id": "0c9d3a3e-9b8e-4b5e-8f0e-1c2d3e4f5a6b",
+            "kind": "record",
+            "subjects": [{"id": "A"}, {"subject": "keyword"}],
+            "trace": {"field": "custom_fields.former"},
+        },
+        {
+            "pid": "abcde-54321",
+            "id": "1c9d3a3e-9b8e-4b5e-8f0e-1c2d3e4f5a6b",
+            "kind": "draft",
+            "subjects": [],
+        },
+    ] == entries
+
+
+def test_journal_keeps_existing_file(tmp_path):
+    filepath = tmp_path / "journal.jsonl"
+    filepath.write_text('{"pid":"abcde-12345"}\n')
+
+    with pytest.raises(FileExistsError):
+        PreImageJournal(filepath)
+    assert '{"pid":"abcde-12345"}\n' == filepath.read_text()
+
+    journal = PreImageJournal(filepath, overwrite=True)
+    journal.close()
+    assert "" == filepath.read_text()